@@ -1,25 +1,34 @@
 import itertools
+from math import ceil, inf
 from tabulate import tabulate
-from typing import List
+from typing import List, Optional, Tuple
 
 from pre_train.generic.const import *
 from pre_train.generic.word_clean import Ar, Ja
-from pre_train.aligner.transliterate import Ja2Ar, Ar2Ja
+from pre_train.aligner.transliterate import Ja2Ar, Ar2Ja, TW
+from pre_train.generic.cache import LRUCache
+
+
+class ComparisonCache(LRUCache):
+    # (clean word AR, clean word JA) -> result of Comparator.compare(), shared by all the Aligners of an alignment job
+    MAX_SIZE = 2**18
+
+    def __init__(self, max_size: int = MAX_SIZE):
+        super().__init__(max_size)
 
 
 class Comparator(object):
-    def __init__(self, word_ar, word_ja):
+    def __init__(self, word_ar, word_ja, fast=True, cache: Optional[ComparisonCache] = None):
         self._word_ar = Ar(word_ar).clean()
         self._word_ja = Ja(word_ja, keep_apostrophe=True).clean()
+        self._fast = fast
+        self._cache = cache
 
-    def compare(self):
-        if self._word_ja == HIDDEN:
-            return False, None
-
+    def _find_candidates(self) -> List[TW]:
         transliterated_to_ja = Ar2Ja(self._word_ar).get_transliterated_words()
         transliterated_to_ar = Ja2Ar(self._word_ja).get_transliterated_words()
 
-        transliterated_candidates = [
+        return [
             tw
             for tw in transliterated_to_ja
             if tw.ja == self._word_ja
@@ -29,6 +38,32 @@ class Comparator(object):
             if tw.ar == self._word_ar
         ]
 
+    def _find_candidates_fast(self) -> List[TW]:
+        # The same candidates (and by the same order), but the letters are matched one by one against the other
+        # word, so the transliterations that are not the other word are never listed
+        return list(Ar2Ja(self._word_ar).iter_matching_words(self._word_ja)) + \
+            list(Ja2Ar(self._word_ja).iter_matching_words(self._word_ar))
+
+    def compare(self):
+        if self._cache is None:
+            return self._compare()
+
+        key = (self._word_ar, self._word_ja)
+        result = self._cache.get(key)
+        if result is None:
+            result = self._compare()
+            self._cache.put(key, result)
+
+        # The callers set the indices of the returned TW, so the cached one is never handed out
+        res, tw = result
+        return res, None if tw is None else tw.copy()
+
+    def _compare(self):
+        if self._word_ja == HIDDEN:
+            return False, None
+
+        transliterated_candidates = self._find_candidates_fast() if self._fast else self._find_candidates()
+
         transliterated_candidates.sort(reverse=True)
         # print(transliterated_candidates)
         if len(transliterated_candidates) > 0:
@@ -42,9 +77,10 @@ class Comparator(object):
 class Aligner(object):
     WORDS_DIST = 10
 
-    def __init__(self, sentence_ar: List[str], sentence_ja: List[str]):
+    def __init__(self, sentence_ar: List[str], sentence_ja: List[str], cache: Optional[ComparisonCache] = None):
         self._sentence_ar = sentence_ar
         self._sentence_ja = sentence_ja
+        self._cache = cache
         self._tws = []
 
         self._run()
@@ -60,7 +96,7 @@ class Aligner(object):
         for j_ar, j_ja in itertools.product(range(i_ar, i_max_ar+1), range(i_ja, i_max_ja+1)):
             word_ar = self._sentence_ar[j_ar]
             word_ja = self._sentence_ja[j_ja]
-            res, tw = Comparator(word_ar, word_ja).compare()
+            res, tw = Comparator(word_ar, word_ja, cache=self._cache).compare()
             if res is True:
                 tw.i_ar, tw.i_ja = j_ar, j_ja
                 return True, tw
@@ -107,3 +143,87 @@ class Aligner(object):
 
     def get_tws(self):
         return self._tws
+
+
+class BandedAligner(Aligner):
+    # Global alignment (Needleman-Wunsch) of the two sentences, restricted to a band of BAND words around the
+    # diagonal. A couple of words scores TW.score() if they match, and every skipped word costs GAP_PENALTY.
+    # Only the band of every row is kept, so the memory is O(len(sentence_ar) * BAND).
+    BAND = 10
+    GAP_PENALTY = 1.0
+
+    _START, _MATCH, _SKIP_AR, _SKIP_JA = 0, 1, 2, 3
+
+    def __init__(self, sentence_ar: List[str], sentence_ja: List[str], cache: Optional[ComparisonCache] = None,
+                 band: int = BAND):
+        if band <= 0:
+            raise ValueError(f"band should be positive, got {band}")
+        self._band = band
+        super().__init__(sentence_ar, sentence_ja, cache=cache)
+
+    def _compare(self, i_ar: int, i_ja: int):
+        return Comparator(self._sentence_ar[i_ar], self._sentence_ja[i_ja], cache=self._cache).compare()
+
+    def _row_range(self, i_ar: int, band: int) -> Tuple[int, int]:
+        len_ar, len_ja = len(self._sentence_ar), len(self._sentence_ja)
+        center = round(i_ar * len_ja / len_ar) if len_ar > 0 else 0
+        return max(0, center - band), min(len_ja, center + band)
+
+    def _fill(self) -> Tuple[List[int], List[bytearray]]:
+        len_ar, len_ja = len(self._sentence_ar), len(self._sentence_ja)
+        # The bands of adjacent rows must overlap, even if one sentence is much longer than the other
+        band = max(self._band, ceil(len_ja / max(len_ar, 1)) + 1)
+
+        rows_lo: List[int] = []
+        traceback: List[bytearray] = []
+        prev_lo, prev_scores = 0, []
+        for i_ar in range(len_ar + 1):
+            lo, hi = self._row_range(i_ar, band)
+            scores = [-inf] * (hi - lo + 1)
+            moves = bytearray(hi - lo + 1)
+
+            for j_ja in range(lo, hi + 1):
+                if i_ar == 0 and j_ja == 0:
+                    best, move = 0.0, self._START
+                else:
+                    best, move = -inf, self._START
+                    if i_ar > 0 and j_ja > 0 and prev_lo <= j_ja - 1 < prev_lo + len(prev_scores) \
+                            and prev_scores[j_ja - 1 - prev_lo] > -inf:
+                        res, tw = self._compare(i_ar - 1, j_ja - 1)
+                        if res is True:
+                            best, move = prev_scores[j_ja - 1 - prev_lo] + tw.score(), self._MATCH
+                    if i_ar > 0 and prev_lo <= j_ja < prev_lo + len(prev_scores) \
+                            and prev_scores[j_ja - prev_lo] - self.GAP_PENALTY > best:
+                        best, move = prev_scores[j_ja - prev_lo] - self.GAP_PENALTY, self._SKIP_AR
+                    if j_ja > lo and scores[j_ja - 1 - lo] - self.GAP_PENALTY > best:
+                        best, move = scores[j_ja - 1 - lo] - self.GAP_PENALTY, self._SKIP_JA
+                scores[j_ja - lo] = best
+                moves[j_ja - lo] = move
+
+            rows_lo.append(lo)
+            traceback.append(moves)
+            prev_lo, prev_scores = lo, scores
+
+        return rows_lo, traceback
+
+    def _parse_sentence(self):
+        rows_lo, traceback = self._fill()
+
+        self._tws = []
+        i_ar, i_ja = len(self._sentence_ar), len(self._sentence_ja)
+        while i_ar > 0 or i_ja > 0:
+            move = traceback[i_ar][i_ja - rows_lo[i_ar]]
+            if move == self._MATCH:
+                res, tw = self._compare(i_ar - 1, i_ja - 1)
+                tw.i_ar, tw.i_ja = i_ar - 1, i_ja - 1
+                self._tws.append(tw)
+                i_ar, i_ja = i_ar - 1, i_ja - 1
+            elif move == self._SKIP_AR:
+                i_ar -= 1
+            elif move == self._SKIP_JA:
+                i_ja -= 1
+            else:
+                return False
+        self._tws.reverse()
+
+        return True
@@ -0,0 +1,155 @@
+import ast
+import json
+import mmap
+import os
+import re
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+Couple = List[Tuple[str, str]]
+
+
+class AlignDataset(object):
+    # A packed, read-only copy of an align tree (<book>/.../<unit>.txt files, one str(tw.couple_letters()) per line),
+    # memory-mapped from a single file. A couple is only decoded when it is read, so selecting some of the books
+    # touches only their part of the file.
+    #
+    # File layout (little-endian):
+    #   magic (8 bytes) | header_size (u32) | header: utf-8 json, padded with spaces to a multiple of 4 bytes
+    #                     {"letters": [...], "units": [[name, book, first couple, end couple], ...]}
+    #   offsets: (n_couples + 1) x u32  - the letter pairs of couple i are pairs[offsets[i]:offsets[i+1]]
+    #   pairs:   n_pairs x 2 x u16      - (ar letter id, ja letter id), ids into the header's letters table
+    MAGIC = b"JAALIGN1"
+    HEADER = struct.Struct("<8sI")
+    PACK_NAME = "align.pack"
+
+    def __init__(self, path: str):
+        self._path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_size = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"The file {path} is not an align dataset")
+
+        offsets_start = self.HEADER.size + header_size
+        header = json.loads(self._mmap[self.HEADER.size:offsets_start].decode("utf-8"))
+        self._letters: List[str] = header["letters"]
+        self._units: Dict[str, Tuple[str, int, int]] = {name: (book, start, end) for name, book, start, end in header["units"]}
+
+        view = memoryview(self._mmap)
+        self._n_couples = header["units"][-1][3] if header["units"] else 0
+        pairs_start = offsets_start + 4 * (self._n_couples + 1)
+        self._offsets = view[offsets_start:pairs_start].cast("I")
+        self._pairs = view[pairs_start:].cast("H")
+
+    def __len__(self):
+        return self._n_couples
+
+    def __getitem__(self, i_couple: int) -> Couple:
+        if i_couple < 0:
+            i_couple += self._n_couples
+        if i_couple < 0 or i_couple >= self._n_couples:
+            raise IndexError(f"couple index {i_couple} is out of range")
+
+        ids = self._pairs[2 * self._offsets[i_couple]:2 * self._offsets[i_couple + 1]]
+        return [(self._letters[ids[i]], self._letters[ids[i + 1]]) for i in range(0, len(ids), 2)]
+
+    def books(self) -> List[str]:
+        books = []
+        for book, _, _ in self._units.values():
+            if book not in books:
+                books.append(book)
+        return books
+
+    def unit_names(self, books: Optional[Iterable[str]] = None) -> List[str]:
+        books = None if books is None else set(books)
+        return [name for name, (book, _, _) in self._units.items() if books is None or book in books]
+
+    def get_unit(self, name: str) -> List[Couple]:
+        _, start, end = self._units[name]
+        return [self[i_couple] for i_couple in range(start, end)]
+
+    def iter_couples(self, books: Optional[Iterable[str]] = None) -> Iterator[Couple]:
+        for name in self.unit_names(books):
+            _, start, end = self._units[name]
+            for i_couple in range(start, end):
+                yield self[i_couple]
+
+    def get_couples(self, books: Optional[Iterable[str]] = None) -> List[Couple]:
+        return list(self.iter_couples(books))
+
+    @staticmethod
+    def _sort_key(name: str):
+        # Numeric names are sorted as numbers, so chapter 10 comes after chapter 9
+        return [(0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"(\d+)", name)]
+
+    @classmethod
+    def _list_units(cls, align_path: str) -> List[Tuple[str, str]]:
+        # (unit name, file path) of all the .txt files of the tree; the unit name is the path relative to the tree,
+        # without the extension
+        units = []
+        for root, dirs, files in os.walk(align_path):
+            for file_name in files:
+                if file_name.endswith(".txt") is False:
+                    continue
+                path = os.path.join(root, file_name)
+                units.append((os.path.relpath(path, align_path)[:-len(".txt")].replace(os.sep, "/"), path))
+
+        return sorted(units, key=lambda unit: cls._sort_key(unit[0]))
+
+    @staticmethod
+    def read_txt(path: str) -> List[Couple]:
+        with open(path, "r", encoding="utf-8") as f:
+            return [ast.literal_eval(line) for line in f if line.strip()]
+
+    @classmethod
+    def write(cls, units: List[Tuple[str, str, List[Couple]]], path: str) -> None:
+        # units: (unit name, book, couples)
+        letters, letter_ids = [], {}
+        header_units, offsets, pairs = [], [0], []
+        for name, book, couples in units:
+            start = len(offsets) - 1
+            for couple in couples:
+                for letter_ar, letter_ja in couple:
+                    for letter in (letter_ar, letter_ja):
+                        if letter not in letter_ids:
+                            letter_ids[letter] = len(letters)
+                            letters.append(letter)
+                        pairs.append(letter_ids[letter])
+                offsets.append(len(pairs) // 2)
+            header_units.append([name, book, start, len(offsets) - 1])
+
+        if len(letters) > 2**16:
+            raise ValueError(f"Too many different letters ({len(letters)}) for an align dataset")
+
+        header = json.dumps({"letters": letters, "units": header_units}, ensure_ascii=False).encode("utf-8")
+        header += b" " * (-len(header) % 4)
+
+        # Written to a temporary file and renamed, so a concurrent reader never sees a partial dataset
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, len(header)))
+            f.write(header)
+            f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            f.write(struct.pack(f"<{len(pairs)}H", *pairs))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def build(cls, align_path: str, path: str) -> None:
+        # The book of a unit is the first part of its name (the sub directory of the tree it is in)
+        units = [(name, name.split("/")[0], cls.read_txt(unit_path)) for name, unit_path in cls._list_units(align_path)]
+        cls.write(units, path)
+
+    @classmethod
+    def load(cls, align_path: str, path: Optional[str] = None) -> "AlignDataset":
+        # Packs the tree if the dataset is missing or older than any of the tree's files
+        path = path or os.path.join(align_path, cls.PACK_NAME)
+        if os.path.exists(align_path) is False and os.path.exists(path) is False:
+            raise FileNotFoundError(f"Neither the align tree {align_path} nor its dataset {path} exist")
+        if os.path.exists(align_path):
+            tree_mtime = max([os.path.getmtime(unit_path) for _, unit_path in cls._list_units(align_path)], default=0)
+            if os.path.exists(path) is False or os.path.getmtime(path) < tree_mtime:
+                cls.build(align_path, path)
+
+        return cls(path)
@@ -1,17 +1,22 @@
 from math import ceil, floor
 from copy import deepcopy
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 from ja_transliteration_tool.pre_train.aligner.transliterate import Ar2Ja, TW
-from ja_transliteration_tool.pre_train.aligner.align import Aligner
+from ja_transliteration_tool.pre_train.aligner.align import Aligner, ComparisonCache
 
 
 class FrequentFinder:
     SUB_MATCH_RANGE = 5
     SUB_MATCH_PCT = 0.75
 
-    def __init__(self, split_ar: List[str], split_ja: List[str]):
+    def __init__(self, split_ar: List[str], split_ja: List[str], cache: Optional[ComparisonCache] = None):
         self._split_ar: List[str] = split_ar
         self._split_ja = split_ja
+        self._cache = cache
+
+        # Inverted indices: word -> its (sorted) positions in the text
+        self._positions_ar = self._positions_mapper(self._split_ar)
+        self._positions_ja = self._positions_mapper(self._split_ja)
 
         self._freq_map_ar = self._freq_mapper()
         self._rare_words_map = self._rare_words_mapper()
@@ -20,14 +25,18 @@ class FrequentFinder:
         self._rare_words_enricher()
         self._new_split = self._text_splitter()
 
-    def _freq_mapper(self) -> Dict[str, int]:
-        freq_map_ar: Dict[str, int] = {}
-        for w in self._split_ar:
-            if w not in freq_map_ar:
-                freq_map_ar[w] = 0
-            freq_map_ar[w] += 1
+    @staticmethod
+    def _positions_mapper(split_text: List[str]) -> Dict[str, List[int]]:
+        positions: Dict[str, List[int]] = {}
+        for i, w in enumerate(split_text):
+            if w not in positions:
+                positions[w] = []
+            positions[w].append(i)
 
-        return freq_map_ar
+        return positions
+
+    def _freq_mapper(self) -> Dict[str, int]:
+        return {w: len(self._positions_ar[w]) for w in self._positions_ar}
 
     def _rare_words_mapper(self) -> Dict[int, List[str]]:
         rare_words = [w for w in self._freq_map_ar if self._freq_map_ar[w] == 1]
@@ -74,13 +83,13 @@ class FrequentFinder:
         i_min_ja, i_max_ja = self._sub_match_idx(tw.i_ja, len(self._split_ja) - 1)
 
         sub_split_ar, sub_split_ja = self._split_ar[i_min_ar:i_max_ar + 1], self._split_ja[i_min_ja:i_max_ja + 1]
-        aligned_result = Aligner(sub_split_ar, sub_split_ja).get_tws()
+        aligned_result = Aligner(sub_split_ar, sub_split_ja, cache=self._cache).get_tws()
 
         return len(aligned_result) / len(sub_split_ar) > self.SUB_MATCH_PCT and len(aligned_result) / len(sub_split_ja) > self.SUB_MATCH_PCT
 
     @staticmethod
-    def _get_word_idx(word: str, split_text: List[str]) -> List[int]:
-        return [i for i in range(len(split_text)) if split_text[i] == word]
+    def _get_word_idx(word: str, positions: Dict[str, List[int]]) -> List[int]:
+        return positions.get(word, [])
 
     def _rare_words_matcher(self) -> List[TW]:
         rare_words_matched: List[TW] = []
@@ -91,11 +100,11 @@ class FrequentFinder:
 
             potential_matches: List[TW] = []
             for tw in transliterated_words:
-                if tw.ja not in self._split_ja:
+                if tw.ja not in self._positions_ja:
                     continue
 
-                tw.i_ar = self._get_word_idx(tw.ar, self._split_ar)[0]
-                indices_ja = self._get_word_idx(tw.ja, self._split_ja)
+                tw.i_ar = self._get_word_idx(tw.ar, self._positions_ar)[0]
+                indices_ja = self._get_word_idx(tw.ja, self._positions_ja)
                 for idx_ja in indices_ja:
                     curr_tw = deepcopy(tw)
                     curr_tw.i_ja = idx_ja
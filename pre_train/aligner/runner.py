@@ -0,0 +1,140 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+from typing import List, Optional, Tuple
+
+from ja_transliteration_tool.pre_train.editor.ja import EditorJa
+from ja_transliteration_tool.pre_train.splitter.ar import SplitterAr
+from ja_transliteration_tool.pre_train.splitter.ja import SplitterJa
+from ja_transliteration_tool.pre_train.aligner.align import Aligner, BandedAligner, ComparisonCache
+from ja_transliteration_tool.pre_train.aligner.frequent_finder import FrequentFinder
+from ja_transliteration_tool.pre_train.generic.const import HIDDEN
+
+
+class AlignUnit(object):
+    # One independent piece of an alignment job: its AR text files (joined by spaces), its JA files (.txt or .csv,
+    # concatenated) and the file its couples are written to
+    def __init__(self, name: str, paths_ar: List[str], paths_ja: List[str], path_out: str):
+        self.name = name
+        self.paths_ar = paths_ar
+        self.paths_ja = paths_ja
+        self.path_out = path_out
+
+    def __repr__(self):
+        return f"<AlignUnit: {self.name}>"
+
+    def is_done(self) -> bool:
+        return os.path.exists(self.path_out)
+
+
+# Every worker process keeps its own comparison cache for all the units it aligns
+_worker_cache: Optional[ComparisonCache] = None
+
+
+def _init_worker() -> None:
+    global _worker_cache
+    _worker_cache = ComparisonCache()
+
+
+def _write_atomically(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def align_unit(unit: AlignUnit, banded: bool = False) -> Tuple[str, int, float, int, int]:
+    # Returns (name, number of couples, seconds, cache hits, cache misses), the cache statistics of this unit only
+    start_time = perf_counter()
+    cache = _worker_cache if _worker_cache is not None else ComparisonCache()
+    hits_before, misses_before = cache.hits, cache.misses
+
+    text_ar = ' '.join([open(path, "r").read() for path in unit.paths_ar])
+    split_ar = SplitterAr(text_ar, keep_punctuation=False).get_split_text()
+    split_ja = []
+    for path in unit.paths_ja:
+        edited_ja = EditorJa(path).get_edited_content()
+        split_ja.extend(SplitterJa(edited_ja, keep_punctuation=False).get_split_text())
+    clear_split_ja = [w for w in split_ja if w != HIDDEN]
+
+    if banded:
+        tws = BandedAligner(split_ar, clear_split_ja, cache=cache).get_tws()
+    else:
+        tws = []
+        for s in FrequentFinder(split_ar, clear_split_ja, cache=cache).get_new_text_split():
+            tws.extend(Aligner(s[0], s[1], cache=cache).get_tws())
+
+    _write_atomically(unit.path_out, "\n".join([str(tw.couple_letters()) for tw in tws]))
+
+    return unit.name, len(tws), perf_counter() - start_time, cache.hits - hits_before, cache.misses - misses_before
+
+
+class AlignmentJob(object):
+    # Aligns the units on a process pool. Every unit is written (atomically) as soon as it is done, and the units
+    # whose output already exists are skipped, so an interrupted job is resumed by running it again.
+    def __init__(self, units: List[AlignUnit], workers: Optional[int] = None, banded: bool = False):
+        self._units = units
+        self._workers = workers
+        self._banded = banded
+        self._timing = {}
+        self._failed = []
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    @staticmethod
+    def chapter_sign_units(ar_path: str, ja_path: str, results_path: str) -> List[AlignUnit]:
+        # {ar,ja}_path/<chapter>/<sign>.txt -> results_path/<chapter>/<sign>.txt
+        units = []
+        chapters = sorted(int(chapter) for chapter in os.listdir(ar_path) if os.path.isdir(f"{ar_path}/{chapter}"))
+        for chapter in chapters:
+            signs = sorted(int(sign.split(".")[0]) for sign in os.listdir(f"{ar_path}/{chapter}") if sign.endswith(".txt"))
+            for sign in signs:
+                units.append(AlignUnit(
+                    name=f"c {chapter} s {sign}",
+                    paths_ar=[f"{ar_path}/{chapter}/{sign}.txt"],
+                    paths_ja=[f"{ja_path}/{chapter}/{sign}.txt"],
+                    path_out=f"{results_path}/{chapter}/{sign}.txt"
+                ))
+
+        return units
+
+    def run(self) -> None:
+        pending = [unit for unit in self._units if unit.is_done() is False]
+        print(f"{len(self._units) - len(pending)} of {len(self._units)} units are already aligned")
+
+        start_time = perf_counter()
+        with ProcessPoolExecutor(max_workers=self._workers, initializer=_init_worker) as executor:
+            futures = {executor.submit(align_unit, unit, self._banded): unit for unit in pending}
+            for i, future in enumerate(as_completed(futures), start=1):
+                unit = futures[future]
+                try:
+                    name, n_couples, seconds, hits, misses = future.result()
+                except Exception as e:
+                    self._failed.append(unit.name)
+                    print(f"[{i}/{len(pending)}] {unit.name}: failed ({e!r})")
+                    continue
+                self._timing[name] = seconds
+                self._cache_hits += hits
+                self._cache_misses += misses
+                print(f"[{i}/{len(pending)}] {name}: {n_couples} couples in {seconds:.1f}s, "
+                      f"cache hit rate {self._hit_rate(hits, misses):.2%}")
+
+        print(f"Aligned {len(self._timing)} units in {perf_counter() - start_time:.1f}s, {len(self._failed)} failed")
+        print(f"Comparison cache (of all the workers): hits={self._cache_hits}, misses={self._cache_misses}, "
+              f"hit_rate={self._hit_rate(self._cache_hits, self._cache_misses):.2%}")
+
+    @staticmethod
+    def _hit_rate(hits: int, misses: int) -> float:
+        return hits / (hits + misses) if hits + misses > 0 else 0.0
+
+    def get_timing(self):
+        # unit name -> seconds
+        return self._timing
+
+    def get_failed(self) -> List[str]:
+        return self._failed
+
+    def get_cache_stats(self) -> Tuple[int, int]:
+        # (hits, misses) of the comparison caches, summed over the units aligned by this run
+        return self._cache_hits, self._cache_misses
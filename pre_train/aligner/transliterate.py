@@ -1,4 +1,5 @@
-import itertools
+import heapq
+from typing import Any, Iterator, List, Optional
 
 from pre_train.generic.const import *
 from pre_train.generic.word_clean import Ja
@@ -87,6 +88,12 @@ class TW(object):
     def append(self, tl: TL):
         self._tls.append(tl)
 
+    def copy(self):
+        # The letters are never changed once created, so the copy shares them
+        tw = TW(list(self._tls), self._trans_from)
+        tw.i_ar, tw.i_ja = self._i_ar, self._i_ja
+        return tw
+
     @property
     def ar(self):
         return ''.join([tl.ar for tl in self._tls])
@@ -138,7 +145,7 @@ class Transliterate(object):
         self._trans_to = Lang.AR if self._trans_from is Lang.JA else Lang.JA
         self._word_from = word
         self._groups_to = []
-        self._words_to = []
+        self._words_to = None
 
         self._run()
 
@@ -155,17 +162,125 @@ class Transliterate(object):
             self._groups_to.append(tls)
 
     def _from_groups_to_words(self):
-        product = list(itertools.product(*self._groups_to))
-        self._words_to = [
-            TW(p, self._trans_from)
-            for p in product
-        ]
+        self._words_to = list(self.iter_transliterated_words())
 
     def _run(self):
+        # The words themselves are generated lazily, see iter_transliterated_words()
         self._from_word_to_groups()
-        self._from_groups_to_words()
+
+    def _to_text(self, tl: TL) -> str:
+        return tl.ar if self._trans_to is Lang.AR else tl.ja
+
+    @staticmethod
+    def _contradicts_prefix(text: str, prefix: Optional[str]) -> bool:
+        if prefix is None:
+            return False
+        return not (text.startswith(prefix) if len(text) >= len(prefix) else prefix.startswith(text))
+
+    def _filter_groups(self, legal_letters: Optional[str]) -> List[List[TL]]:
+        if legal_letters is None:
+            return self._groups_to
+        return [[tl for tl in group if all(l in legal_letters for l in self._to_text(tl))] for group in self._groups_to]
+
+    def _iter_words(self, groups: List[List[TL]], i_group: int, tls: List[TL], text: str,
+                    prefix: Optional[str], lexicon: Any, node: Any) -> Iterator[TW]:
+        if i_group == len(groups):
+            if (prefix is None or text.startswith(prefix)) and (lexicon is None or lexicon.is_word(node)):
+                yield TW(list(tls), self._trans_from)
+            return
+
+        for tl in groups[i_group]:
+            curr_text = text + self._to_text(tl)
+            if self._contradicts_prefix(curr_text, prefix):
+                continue
+            curr_node = None if lexicon is None else lexicon.step(node, self._to_text(tl))
+            if lexicon is not None and curr_node is None:
+                continue
+            tls.append(tl)
+            yield from self._iter_words(groups, i_group + 1, tls, curr_text, prefix, lexicon, curr_node)
+            tls.pop()
+
+    def iter_transliterated_words(self, prefix: Optional[str] = None, legal_letters: Optional[str] = None,
+                                  lexicon: Any = None) -> Iterator[TW]:
+        # Yields the transliterated words lazily, by the same order as the full product of the letter options.
+        # A branch is pruned as soon as its transliteration does not match the prefix, or uses a letter that is not
+        # in legal_letters (both refer to the transliterated-to side).
+        # If a lexicon is given (an object with root(), step(node, text) -> node or None, and is_word(node)), it is
+        # walked in step with the options, so only its words are yielded and a branch dies with its last prefix.
+        node = None if lexicon is None else lexicon.root()
+        yield from self._iter_words(self._filter_groups(legal_letters), 0, [], "", prefix, lexicon, node)
+
+    def _can_end_table(self, target: str) -> List[List[bool]]:
+        # can_end[i][j] is True iff the letters from i on can be transliterated to exactly target[j:]
+        texts = [[self._to_text(tl) for tl in group] for group in self._groups_to]
+        can_end = [[False] * (len(target) + 1) for _ in range(len(texts) + 1)]
+        can_end[len(texts)][len(target)] = True
+        for i_group in reversed(range(len(texts))):
+            for j in range(len(target) + 1):
+                can_end[i_group][j] = any(
+                    target.startswith(text, j) and can_end[i_group + 1][j + len(text)]
+                    for text in texts[i_group]
+                )
+
+        return can_end
+
+    def _iter_matching_words(self, target: str, can_end: List[List[bool]], i_group: int, j: int,
+                             tls: List[TL]) -> Iterator[TW]:
+        if i_group == len(self._groups_to):
+            yield TW(list(tls), self._trans_from)
+            return
+
+        for tl in self._groups_to[i_group]:
+            text = self._to_text(tl)
+            if target.startswith(text, j) is False or can_end[i_group + 1][j + len(text)] is False:
+                continue
+            tls.append(tl)
+            yield from self._iter_matching_words(target, can_end, i_group + 1, j + len(text), tls)
+            tls.pop()
+
+    def is_transliterated_to(self, target: str) -> bool:
+        return self._can_end_table(target)[0][0]
+
+    def iter_matching_words(self, target: str) -> Iterator[TW]:
+        # Yields only the transliterations that are exactly the target, by the product order. Every expanded branch
+        # is known (by the can_end table) to complete, so the cost depends on the number of matches only.
+        can_end = self._can_end_table(target)
+        if can_end[0][0] is False:
+            return
+        yield from self._iter_matching_words(target, can_end, 0, 0, [])
+
+    def iter_best_transliterated_words(self, prefix: Optional[str] = None,
+                                       legal_letters: Optional[str] = None) -> Iterator[TW]:
+        # Yields the transliterated words from the best TW.score down (best-first search, where the bound of a
+        # partial word is its score plus the best scores of the remaining letters). Ties keep the product order.
+        groups = self._filter_groups(legal_letters)
+        if any(len(group) == 0 for group in groups):
+            return
+
+        best_rest = [0.0] * (len(groups) + 1)
+        for i_group in reversed(range(len(groups))):
+            best_rest[i_group] = best_rest[i_group + 1] + max(tl.score() for tl in groups[i_group])
+
+        # (-bound, option indices, score of the chosen letters, transliterated text)
+        heap = [(-best_rest[0], (), 0, "")]
+        while heap:
+            _, indices, score, text = heapq.heappop(heap)
+            i_group = len(indices)
+            if i_group == len(groups):
+                if prefix is None or text.startswith(prefix):
+                    yield TW([groups[i][i_tl] for i, i_tl in enumerate(indices)], self._trans_from)
+                continue
+
+            for i_tl, tl in enumerate(groups[i_group]):
+                curr_text = text + self._to_text(tl)
+                if self._contradicts_prefix(curr_text, prefix):
+                    continue
+                curr_score = score + tl.score()
+                heapq.heappush(heap, (-(curr_score + best_rest[i_group + 1]), indices + (i_tl,), curr_score, curr_text))
 
     def get_transliterated_words(self):
+        if self._words_to is None:
+            self._from_groups_to_words()
         return self._words_to
 
 
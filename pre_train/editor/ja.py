@@ -1,4 +1,5 @@
 import pandas as pd
+from typing import List, Optional, Tuple
 
 
 class EditorJa(object):
@@ -10,9 +11,11 @@ class EditorJa(object):
     HEBREW = 1
     NON_HEBREW = 0
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, content: Optional[List[Tuple[str, int]]] = None):
+        # content: the (word, is_he) records of the file, if they were already read (e.g. from a ScrapeStore)
         self._file_path = file_path
-        self._file_content = []
+        self._file_content = content if content is not None else []
+        self._has_content = content is not None
         self._edited_content = None
 
         self._run()
@@ -62,7 +65,8 @@ class EditorJa(object):
         return edited_content
 
     def _run(self):
-        self._file_content = self._get_file_content(self._file_path) if self._file_path.endswith(".txt") else self._get_csv_content(self._file_path)
+        if self._has_content is False:
+            self._file_content = self._get_file_content(self._file_path) if self._file_path.endswith(".txt") else self._get_csv_content(self._file_path)
         self._edited_content = self._edit_content(self._file_content)
 
     def get_edited_content(self):
@@ -0,0 +1,141 @@
+import csv
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from typing import Iterator, List, Tuple
+
+Record = Tuple[str, int]
+
+
+class ScrapeStore(object):
+    # All the ja_file.csv files of a scrapes tree (<book>/<chapter>/.../ja_file.csv, columns: word, is_he) packed into
+    # a single memory-mapped file, with a table from every file's directory to its records.
+    #
+    # File layout (little-endian):
+    #   magic (8 bytes) | header_size (u32) | header: utf-8 json, padded with spaces to a multiple of 4 bytes
+    #                     {"paths": [[path, first record, end record], ...]}, a path is "<book>/<chapter>/..."
+    #   offsets: (n_records + 1) x u32  - the utf-8 bytes of the word of record i are blob[offsets[i]:offsets[i+1]]
+    #   is_he:   n_records x u8
+    #   blob:    the utf-8 bytes of all the words
+    MAGIC = b"JASCRAP1"
+    HEADER = struct.Struct("<8sI")
+    FILE_NAME = "ja_file.csv"
+
+    def __init__(self, path: str):
+        self._path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_size = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"The file {path} is not a scrapes store")
+
+        offsets_start = self.HEADER.size + header_size
+        header = json.loads(self._mmap[self.HEADER.size:offsets_start].decode("utf-8"))
+        self._paths: List[Tuple[str, int, int]] = [tuple(p) for p in header["paths"]]
+        self._ranges = {path: (start, end) for path, start, end in self._paths}
+        self._n_records = self._paths[-1][2] if self._paths else 0
+
+        view = memoryview(self._mmap)
+        is_he_start = offsets_start + 4 * (self._n_records + 1)
+        blob_start = is_he_start + self._n_records
+        self._offsets = view[offsets_start:is_he_start].cast("I")
+        self._is_he = view[is_he_start:blob_start]
+        self._blob = view[blob_start:]
+
+    def __len__(self):
+        return self._n_records
+
+    def __contains__(self, path: str):
+        return path in self._ranges
+
+    def books(self) -> List[str]:
+        books = []
+        for path, _, _ in self._paths:
+            book = path.split("/")[0]
+            if not books or books[-1] != book:
+                books.append(book)
+        return books
+
+    def paths(self, prefix: str = "") -> List[str]:
+        # The paths under the prefix: a book, a chapter ("<book>/<chapter>") or a single path
+        prefix = prefix.strip("/")
+        return [path for path, _, _ in self._paths if not prefix or path == prefix or path.startswith(prefix + "/")]
+
+    def _iter_range(self, start: int, end: int) -> Iterator[Record]:
+        for i_record in range(start, end):
+            word = bytes(self._blob[self._offsets[i_record]:self._offsets[i_record + 1]]).decode("utf-8")
+            yield word, self._is_he[i_record]
+
+    def get_records(self, path: str) -> List[Record]:
+        # The records of a single ja_file.csv, like EditorJa reads them
+        start, end = self._ranges[path.strip("/")]
+        return list(self._iter_range(start, end))
+
+    def iter_records(self, prefix: str = "") -> Iterator[Record]:
+        for path in self.paths(prefix):
+            yield from self._iter_range(*self._ranges[path])
+
+    def iter_files(self, prefix: str = "") -> Iterator[Tuple[str, List[Record]]]:
+        for path in self.paths(prefix):
+            yield path, list(self._iter_range(*self._ranges[path]))
+
+    @staticmethod
+    def _sort_key(path: str):
+        # Numeric parts are sorted as numbers, so chapter "10 - ..." comes after chapter "9 - ..."
+        return [(0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"(\d+)", path)]
+
+    @classmethod
+    def _list_files(cls, scrapes_path: str) -> List[Tuple[str, str]]:
+        # (path, csv file path) of all the ja_file.csv files of the tree (.DS_Store and the like are skipped)
+        files = []
+        for root, dirs, file_names in os.walk(scrapes_path):
+            if cls.FILE_NAME in file_names:
+                files.append((os.path.relpath(root, scrapes_path).replace(os.sep, "/"), os.path.join(root, cls.FILE_NAME)))
+
+        return sorted(files, key=lambda file: cls._sort_key(file[0]))
+
+    @staticmethod
+    def read_csv(csv_path: str) -> List[Record]:
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            return [(row["word"], int(row["is_he"])) for row in csv.DictReader(f)]
+
+    @classmethod
+    def build(cls, scrapes_path: str, path: str) -> None:
+        header_paths = []
+        offsets, is_he, blob = array("I", [0]), bytearray(), bytearray()
+        for file_path, csv_path in cls._list_files(scrapes_path):
+            start = len(is_he)
+            for word, language in cls.read_csv(csv_path):
+                blob += word.encode("utf-8")
+                offsets.append(len(blob))
+                is_he.append(language)
+            header_paths.append([file_path, start, len(is_he)])
+
+        header = json.dumps({"paths": header_paths}, ensure_ascii=False).encode("utf-8")
+        header += b" " * (-len(header) % 4)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+
+        # Written to a temporary file and renamed, so a concurrent reader never sees a partial store
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, len(header)))
+            f.write(header)
+            f.write(offsets.tobytes())
+            f.write(is_he)
+            f.write(blob)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, scrapes_path: str, path: str, rebuild: bool = False) -> "ScrapeStore":
+        # Walking the whole tree for its modification times costs as much as packing it, so the store is only built
+        # when it is missing (or when asked to)
+        if rebuild or os.path.exists(path) is False:
+            cls.build(scrapes_path, path)
+
+        return cls(path)
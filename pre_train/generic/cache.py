@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable
+
+
+class LRUCache(object):
+    # A bounded, thread-safe cache that drops the least recently used item when it is full, and counts hits/misses
+    def __init__(self, max_size: int):
+        if max_size <= 0:
+            raise ValueError(f"max_size should be positive, got {max_size}")
+
+        self._max_size = max_size
+        self._items: OrderedDict = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key: Hashable):
+        return key in self._items
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def hit_rate(self) -> float:
+        total = self._hits + self._misses
+        return self._hits / total if total > 0 else 0.0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._items:
+                self._misses += 1
+                return default
+
+            self._hits += 1
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            if len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def __repr__(self):
+        return f"<{type(self).__name__}: size={len(self._items)}/{self._max_size}, hits={self._hits}, misses={self._misses}, " \
+               f"hit_rate={self.hit_rate():.2%}>"
@@ -1,10 +1,5 @@
 import os
-from ja_transliteration_tool.pre_train.editor.ja import EditorJa
-from ja_transliteration_tool.pre_train.splitter.ar import SplitterAr
-from ja_transliteration_tool.pre_train.splitter.ja import SplitterJa
-from ja_transliteration_tool.pre_train.aligner.align import Aligner
-from ja_transliteration_tool.pre_train.generic.const import HIDDEN
-from ja_transliteration_tool.pre_train.aligner.frequent_finder import FrequentFinder
+from ja_transliteration_tool.pre_train.aligner.runner import AlignmentJob, AlignUnit
 
 MAIN_PATH = "../../resources/hakdama lamishna/"
 AR_PATH = MAIN_PATH + "ar/"
@@ -44,26 +39,20 @@ RESULTS_PATH = MAIN_PATH + "align/"
 
 # assert len(AR_IDX) == len(JA_IDX)
 
-paths_ar = os.listdir(AR_PATH)
-paths_ar.sort()
-text_ar = ' '.join([open(f"{AR_PATH}/{path}", "r").read() for path in paths_ar])
+if __name__ == "__main__":
+    paths_ar = os.listdir(AR_PATH)
+    paths_ar.sort()
 
-ja_path = f"{JA_PATH}/ja_file.csv"
+    # The whole book is a single unit
+    unit = AlignUnit(
+        name="hakdama lamishna",
+        paths_ar=[f"{AR_PATH}/{path}" for path in paths_ar],
+        paths_ja=[f"{JA_PATH}/ja_file.csv"],
+        path_out=f"{RESULTS_PATH}/align.txt"
+    )
+    AlignmentJob([unit], workers=1).run()
 
-split_ar = SplitterAr(text_ar, keep_punctuation=False).get_split_text()
-edited_ja = EditorJa(ja_path).get_edited_content()
-split_ja = SplitterJa(edited_ja, keep_punctuation=False).get_split_text()
-clear_split_ja = [w for w in split_ja if w != HIDDEN]
-new_split = FrequentFinder(split_ar, clear_split_ja).get_new_text_split()
-
-coupling = []
-for s in new_split:
-    coupling.extend(Aligner(s[0], s[1]).get_tws())
-
-with open(f"{RESULTS_PATH}/align.txt", "w") as f:
-    f.write("\n".join([str(tw.couple_letters()) for tw in coupling]))
-
-print(1)
+    print(1)
 
 
 # for i in range(len(AR_IDX)):
@@ -0,0 +1,12 @@
+from ja_transliteration_tool.pre_train.aligner.dataset import AlignDataset
+
+ALIGN_PATH = "../../resources/align/"
+PACK_PATH = ALIGN_PATH + AlignDataset.PACK_NAME
+
+AlignDataset.build(ALIGN_PATH, PACK_PATH)
+
+dataset = AlignDataset(PACK_PATH)
+for book in dataset.books():
+    print(f"{book}: {len(dataset.unit_names([book]))} units, {len(dataset.get_couples([book]))} couples")
+
+print(1)
@@ -0,0 +1,21 @@
+from ja_transliteration_tool.pre_train.editor.ja import EditorJa
+from ja_transliteration_tool.pre_train.editor.scrapes import ScrapeStore
+
+SCRAPES_PATH = "../../resources/scrapes/"
+STORE_PATH = "../../resources/scrapes.pack"
+
+store = ScrapeStore.load(SCRAPES_PATH, STORE_PATH, rebuild=True)
+
+for book in store.books():
+    n_words, n_he = 0, 0
+    for word, is_he in store.iter_records(book):
+        n_words += 1
+        n_he += is_he
+    print(f"{book}: {len(store.paths(book))} files, {n_words} words, {n_he} HE")
+
+# A single file is edited from the store, without reading its csv
+path = store.paths()[0]
+edited_ja = EditorJa(f"{SCRAPES_PATH}/{path}/{ScrapeStore.FILE_NAME}", content=store.get_records(path)).get_edited_content()
+print(path, len(edited_ja))
+
+print(1)
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from run.document import Document
+from run.e2e_pipe import Import, Export, PipelineManager
+
+
+class AsyncImport(Import):
+    # The same inputs as Import (by_docx_path stays synchronous), and fetch_docx_path fetches a Google Doc on a worker
+    # thread, so the event loop keeps running (and other documents keep being fetched and transliterated) meanwhile
+    async def fetch_docx_path(self, document_url: str) -> None:
+        await asyncio.to_thread(self.by_docx_path, document_url)
+
+    @classmethod
+    async def fetch_docx(cls, document_url: str) -> List[str]:
+        initial_input = cls()
+        await initial_input.fetch_docx_path(document_url)
+        return initial_input.output()
+
+
+class AsyncExport:
+    # Export on a worker thread: building the document and the Drive calls (upload, convert, permission) of one
+    # document run one after another, but they overlap with the other documents. The local file formats write every
+    # document to its own unique file (in output_dir), so the concurrent exports never collide.
+    @staticmethod
+    async def run(inp: Document, global_start_time: datetime, output_format: str,
+                  output_dir: Optional[str] = None) -> Any:
+        return await asyncio.to_thread(
+            lambda: Export(inp, global_start_time=global_start_time, output_format=output_format,
+                           output_dir=output_dir).output()
+        )
+
+
+class AsyncPipelineManager:
+    # The PipelineManager stages for many documents at once: the fetches and the exports run on threads, concurrently,
+    # and the NN stages run on a single executor thread, so one document is fetched while another is transliterated
+    MAX_CONCURRENT_FETCHES = 4
+    MAX_QUEUED_DOCUMENTS = 4
+
+    _nn_stats: Dict[str, Tuple[int, float]]
+
+    def __init__(self, output_format: str = "by_docx_path", batch_size: Optional[int] = None,
+                 max_concurrent_fetches: int = MAX_CONCURRENT_FETCHES, output_dir: Optional[str] = None,
+                 max_queued_documents: int = MAX_QUEUED_DOCUMENTS):
+        if max_concurrent_fetches <= 0:
+            raise ValueError(f"max_concurrent_fetches should be positive, got {max_concurrent_fetches}")
+        if max_queued_documents <= 0:
+            raise ValueError(f"max_queued_documents should be positive, got {max_queued_documents}")
+
+        self._output_format = output_format
+        self._batch_size = batch_size
+        self._max_concurrent_fetches = max_concurrent_fetches
+        self._max_queued_documents = max_queued_documents
+        self._output_dir = output_dir
+        self._nn_stats = {}
+        self._nn_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nn")
+
+    async def __aenter__(self) -> AsyncPipelineManager:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._nn_executor.shutdown(wait=True)
+
+    def _run_stages(self, inp: List[str]) -> Document:
+        in_pipeline = PipelineManager._run_pre_pipeline(inp)
+        return PipelineManager._run_in_pipeline(in_pipeline, self._batch_size, self._nn_stats)
+
+    async def run(self, inp: List[str]) -> Any:
+        global_start_time = datetime.now()
+        post_pipeline = await asyncio.get_running_loop().run_in_executor(self._nn_executor, self._run_stages, inp)
+
+        return await AsyncExport.run(post_pipeline, global_start_time, self._output_format, self._output_dir)
+
+    async def run_many(self, inputs: List[List[str]]) -> List[Any]:
+        return await asyncio.gather(*(self.run(inp) for inp in inputs))
+
+    async def run_docx_paths(self, document_urls: List[str]) -> List[Any]:
+        # Outputs by the order of the URLs. The fetchers put the fetched documents into a bounded queue, and wait while
+        # it is full; a document leaves the queue only when one of the max_queued_documents transliteration (and
+        # export) slots is free. So when the NN stages fall behind the fetching stops, and the number of documents
+        # in memory is bounded by max_concurrent_fetches + 2 * max_queued_documents, whatever the number of URLs.
+        pending_urls: asyncio.Queue = asyncio.Queue()
+        for i_url, document_url in enumerate(document_urls):
+            pending_urls.put_nowait((i_url, document_url))
+        fetched: asyncio.Queue = asyncio.Queue(maxsize=self._max_queued_documents)
+        slots = asyncio.Semaphore(self._max_queued_documents)
+        results: List[Any] = [None] * len(document_urls)
+        errors: List[Optional[BaseException]] = [None] * len(document_urls)
+
+        async def fetch() -> None:
+            while pending_urls.empty() is False:
+                i_url, document_url = pending_urls.get_nowait()
+                try:
+                    await fetched.put((i_url, await AsyncImport.fetch_docx(document_url), None))
+                except Exception as e:
+                    await fetched.put((i_url, None, e))
+
+        async def process(i_url: int, inp: List[str]) -> None:
+            try:
+                results[i_url] = await self.run(inp)
+            except Exception as e:
+                errors[i_url] = e
+            finally:
+                slots.release()
+
+        async def consume() -> None:
+            tasks = []
+            for _ in range(len(document_urls)):
+                await slots.acquire()
+                i_url, inp, error = await fetched.get()
+                if error is not None:
+                    errors[i_url] = error
+                    slots.release()
+                    continue
+                tasks.append(asyncio.create_task(process(i_url, inp)))
+            await asyncio.gather(*tasks)
+
+        n_fetchers = min(self._max_concurrent_fetches, len(document_urls))
+        await asyncio.gather(consume(), *(fetch() for _ in range(n_fetchers)))
+
+        # Like gather, the first error is raised, but only after all the other documents are done
+        for error in errors:
+            if error is not None:
+                raise error
+        return results
+
+    def get_nn_stats(self) -> Dict[str, Tuple[int, float]]:
+        # Per NN stage: (number of tokens, seconds spent in inference)
+        return self._nn_stats
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type
+
+from pre_train.editor.scrapes import ScrapeStore
+from run.borrow_detect.borrow import FreqCalculator
+from run.e2e_pipe import Import, PipelineManager
+from run.sinks import DocxSink, FileSink, JsonlSink, LinePair, TsvSink, TxtSink
+
+# Transliterates every document of a directory tree: .txt and .docx files (a line per line / paragraph), and the
+# ja_file.csv files of the scrapes (every file is one line). Every document is written, atomically, to
+# <output root>/<its path in the tree>.ar.<format> (a transliterated line per input line for txt, the JA and the
+# transliterated lines for tsv, jsonl and docx), and is recorded in the checkpoint file, so running the same job again
+# skips the documents that are done.
+#
+#   python -m run.batch "resources/scrapes/תפסיר רות" --output-root out/ --workers 4 --format tsv
+SUFFIXES = (".txt", ".docx", ".csv")
+OUTPUT_INFIX = ".ar"
+FORMATS: Dict[str, Type[FileSink]] = {
+    "txt": TxtSink,
+    "tsv": TsvSink,
+    "jsonl": JsonlSink,
+    "docx": DocxSink
+}
+OUTPUT_SUFFIXES = tuple(OUTPUT_INFIX + sink_class.SUFFIX for sink_class in FORMATS.values())
+CHECKPOINT_NAME = ".batch_checkpoint.jsonl"
+
+NNStats = Dict[str, Tuple[int, float]]
+
+
+def find_documents(input_path: str) -> List[str]:
+    if os.path.isfile(input_path):
+        return [input_path]
+
+    documents = []
+    for root, dirs, files in os.walk(input_path):
+        for file_name in files:
+            if file_name.endswith(OUTPUT_SUFFIXES) or file_name.endswith(SUFFIXES) is False:
+                continue
+            if file_name.endswith(".csv") and file_name != ScrapeStore.FILE_NAME:
+                continue
+            documents.append(os.path.join(root, file_name))
+
+    return sorted(documents)
+
+
+def read_document(path: str) -> List[str]:
+    initial_input = Import()
+    if path.endswith(".docx"):
+        initial_input.by_docx_file(path)
+    elif path.endswith(".csv"):
+        initial_input.by_list_str([' '.join(word for word, _ in ScrapeStore.read_csv(path))])
+    else:
+        initial_input.by_txt_file(path)
+
+    return initial_input.output()
+
+
+def output_path_of(path: str, input_root: str, output_root: Optional[str], output_format: str = "txt") -> str:
+    output_suffix = OUTPUT_INFIX + FORMATS[output_format].SUFFIX
+    if output_root is None:
+        return path + output_suffix
+
+    relative_path = os.path.relpath(path, input_root) if os.path.isdir(input_root) else os.path.basename(path)
+    return os.path.join(output_root, relative_path + output_suffix)
+
+
+def _init_worker() -> None:
+    # Every worker loads the models (and the corpora) once, and keeps them for all its documents
+    FreqCalculator.prefetch()
+    PipelineManager.preload_models()
+
+
+def transliterate_document(path: str, output_path: str, output_format: str, chunk_size: int,
+                           batch_size: Optional[int]) -> Tuple[str, int, int, float, NNStats]:
+    start_time = perf_counter()
+    global_start_time = datetime.now()
+    nn_stats: NNStats = {}
+    counts = [0, 0]  # lines, tokens
+
+    def counted(pairs: Iterable[LinePair]) -> Iterator[LinePair]:
+        for ja_line, ar_line in pairs:
+            counts[0] += 1
+            counts[1] += len(ja_line.split())
+            yield ja_line, ar_line
+
+    lines = read_document(path)
+    pairs = PipelineManager.stream(lines, chunk_size=chunk_size, batch_size=batch_size, nn_stats=nn_stats)
+    FORMATS[output_format](path=output_path).write_lines(counted(pairs), global_start_time)
+
+    return path, counts[0], counts[1], perf_counter() - start_time, nn_stats
+
+
+class BatchJob:
+    def __init__(self, input_path: str, output_root: Optional[str] = None, workers: int = 1,
+                 chunk_size: int = PipelineManager.STREAM_CHUNK_SIZE, batch_size: Optional[int] = None,
+                 checkpoint_path: Optional[str] = None, output_format: str = "txt"):
+        if workers <= 0:
+            raise ValueError(f"workers should be positive, got {workers}")
+        if output_format not in FORMATS:
+            raise KeyError(f"output_format {output_format} not legal, options: {list(FORMATS.keys())}")
+
+        self._input_path = input_path
+        self._output_root = output_root
+        self._workers = workers
+        self._chunk_size = chunk_size
+        self._batch_size = batch_size
+        self._output_format = output_format
+        default_checkpoint_dir = output_root or (input_path if os.path.isdir(input_path) else os.path.dirname(input_path))
+        self._checkpoint_path = checkpoint_path or os.path.join(default_checkpoint_dir, CHECKPOINT_NAME)
+
+        self._n_documents = 0
+        self._n_lines = 0
+        self._n_tokens = 0
+        self._nn_stats: NNStats = {}
+        self._failed: List[str] = []
+
+    def _read_checkpoint(self) -> Set[str]:
+        if os.path.exists(self._checkpoint_path) is False:
+            return set()
+
+        with open(self._checkpoint_path, "r", encoding="utf-8") as f:
+            return {json.loads(line)["path"] for line in f if line.strip()}
+
+    def _write_checkpoint(self, path: str, n_lines: int, n_tokens: int, seconds: float) -> None:
+        os.makedirs(os.path.dirname(self._checkpoint_path) or ".", exist_ok=True)
+        with open(self._checkpoint_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"path": path, "lines": n_lines, "tokens": n_tokens, "seconds": seconds}, ensure_ascii=False) + "\n")
+
+    def _pending(self) -> List[Tuple[str, str]]:
+        done = self._read_checkpoint()
+        pending = []
+        for path in find_documents(self._input_path):
+            output_path = output_path_of(path, self._input_path, self._output_root, self._output_format)
+            if path in done and os.path.exists(output_path):
+                continue
+            pending.append((path, output_path))
+
+        return pending
+
+    def _on_done(self, i: int, n_pending: int, result: Tuple[str, int, int, float, NNStats]) -> None:
+        path, n_lines, n_tokens, seconds, nn_stats = result
+        self._write_checkpoint(path, n_lines, n_tokens, seconds)
+        self._n_documents += 1
+        self._n_lines += n_lines
+        self._n_tokens += n_tokens
+        for task_name, (tokens, task_seconds) in nn_stats.items():
+            prev_tokens, prev_seconds = self._nn_stats.get(task_name, (0, 0.0))
+            self._nn_stats[task_name] = (prev_tokens + tokens, prev_seconds + task_seconds)
+        print(f"[{i}/{n_pending}] {path}: {n_lines} lines in {seconds:.1f}s")
+
+    def _iter_results(self, pending: List[Tuple[str, str]]) -> Iterator[Tuple[str, Optional[Tuple], Optional[Exception]]]:
+        if len(pending) == 0:
+            return
+
+        if self._workers == 1:
+            _init_worker()
+            for path, output_path in pending:
+                try:
+                    yield path, transliterate_document(path, output_path, self._output_format, self._chunk_size,
+                                                       self._batch_size), None
+                except Exception as e:
+                    yield path, None, e
+            return
+
+        with ProcessPoolExecutor(max_workers=self._workers, initializer=_init_worker) as executor:
+            futures = {
+                executor.submit(transliterate_document, path, output_path, self._output_format, self._chunk_size,
+                                self._batch_size): path
+                for path, output_path in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+
+    def run(self) -> None:
+        pending = self._pending()
+        print(f"{len(pending)} documents to transliterate (the checkpoint is {self._checkpoint_path})")
+
+        start_time = perf_counter()
+        for i, (path, result, error) in enumerate(self._iter_results(pending), start=1):
+            if error is not None:
+                self._failed.append(path)
+                print(f"[{i}/{len(pending)}] {path}: failed ({error!r})")
+                continue
+            self._on_done(i, len(pending), result)
+
+        self.print_summary(perf_counter() - start_time)
+
+    def print_summary(self, seconds: float) -> None:
+        print(f"Transliterated {self._n_documents} documents ({len(self._failed)} failed) in {seconds:.1f}s: "
+              f"{self._n_lines / seconds if seconds > 0 else 0.0:.1f} lines/sec, "
+              f"{self._n_tokens / seconds if seconds > 0 else 0.0:.1f} tokens/sec")
+        PipelineManager.print_nn_stats(self._nn_stats)
+
+    def get_failed(self) -> List[str]:
+        return self._failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Transliterates all the documents of a directory tree")
+    parser.add_argument("input_path", help="a directory tree (or a single file) of .txt, .docx and ja_file.csv files")
+    parser.add_argument("--output-root", default=None,
+                        help="where to write the outputs (by the tree's structure), next to the inputs by default")
+    parser.add_argument("--format", default="txt", choices=list(FORMATS.keys()), help="the output format")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, each with its own models")
+    parser.add_argument("--chunk-size", type=int, default=PipelineManager.STREAM_CHUNK_SIZE,
+                        help="lines per pipeline run")
+    parser.add_argument("--batch-size", type=int, default=None, help="the batch size of the NN inference")
+    parser.add_argument("--checkpoint", default=None, help=f"the checkpoint file ({CHECKPOINT_NAME} by default)")
+    args = parser.parse_args()
+
+    BatchJob(args.input_path, output_root=args.output_root, workers=args.workers, chunk_size=args.chunk_size,
+             batch_size=args.batch_size, checkpoint_path=args.checkpoint, output_format=args.format).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import random
+from copy import deepcopy
+from time import perf_counter
+from typing import List
+
+from run.document import Word, Document
+from run.e2e_pipe import Transliterate
+
+# A micro-benchmark of the merge of the transliterated AR words back into their lines: the previous merge, that
+# deep-copied every word of every line into new lines, against the in-place merge into the document. The previous
+# merge is timed with the previous Word (BaselineWord below), that copy.deepcopy copies by its generic __dict__ path,
+# and not with the current Word, whose __deepcopy__ is a cheap constructor call.
+N_LINES = 20000
+WORDS_PER_LINE = 40
+AR_RATIO = 0.8
+REPEATS = 3
+
+HE_LETTERS = "אבגדהוזחטיכלמנסעפצקרשתךםןףץ"
+AR_LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+
+
+class BaselineWord:
+    # Word as it was before the columnar Document: a plain object, without __slots__ and without __deepcopy__
+    def __init__(self, original_word: str, result_word: str, lang: Word.Lang):
+        self._original_word: str = original_word
+        self._processed_word: str = result_word
+        self._lang: Word.Lang = lang
+
+    @property
+    def original_word(self) -> str:
+        return self._original_word
+
+    @property
+    def processed_word(self) -> str:
+        return self._processed_word
+
+    @property
+    def lang(self) -> Word.Lang:
+        return self._lang
+
+
+def merge_ar_he_deepcopy(original_line: List[BaselineWord], ar_line: List[BaselineWord]) -> List[BaselineWord]:
+    merged_line = []
+
+    i_ar = 0
+    for original_word in original_line:
+        if original_word.lang == Word.Lang.AR:
+            merged_line.append(deepcopy(ar_line[i_ar]))
+            i_ar += 1
+        else:
+            merged_line.append(deepcopy(original_word))
+
+    return merged_line
+
+
+def make_document() -> Document:
+    random.seed(0)
+    lines = [
+        ' '.join(''.join(random.choice(HE_LETTERS) for _ in range(random.randint(2, 8))) for _ in range(WORDS_PER_LINE))
+        for _ in range(N_LINES)
+    ]
+    document = Document.from_lines(lines)
+    for i_word in range(document.n_words()):
+        document.set_lang(i_word, Word.Lang.AR if random.random() < AR_RATIO else Word.Lang.NAR)
+
+    return document
+
+
+def make_ar_lines(document: Document) -> List[List[Word]]:
+    ar_lines = []
+    for i_line in range(len(document)):
+        words, langs = document.line_words(i_line), document.line_langs(i_line)
+        ar_lines.append([Word(word, ''.join(random.choice(AR_LETTERS) for _ in word), Word.Lang.AR)
+                         for word, lang in zip(words, langs) if lang == Word.Lang.AR])
+
+    return ar_lines
+
+
+def bench_deepcopy(document: Document, ar_lines: List[List[Word]]) -> float:
+    # The previous pipeline held the lines as lists of Words
+    lines = [[BaselineWord(word.original_word, word.processed_word, word.lang) for word in document[i_line]]
+             for i_line in range(len(document))]
+    baseline_ar_lines = [[BaselineWord(word.original_word, word.processed_word, word.lang) for word in ar_line]
+                         for ar_line in ar_lines]
+
+    start_time = perf_counter()
+    for line, ar_line in zip(lines, baseline_ar_lines):
+        merge_ar_he_deepcopy(line, ar_line)
+    return perf_counter() - start_time
+
+
+def bench_in_place(document: Document, ar_lines: List[List[Word]]) -> float:
+    ar_pairs = [[(word.original_word, word.processed_word) for word in ar_line] for ar_line in ar_lines]
+
+    start_time = perf_counter()
+    for i_line, ar_line in enumerate(ar_pairs):
+        Transliterate._merge_ar_he(document, i_line, ar_line)
+    return perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    document = make_document()
+    ar_lines = make_ar_lines(document)
+    n_tokens = document.n_words()
+
+    for name, bench in [("deepcopy", bench_deepcopy), ("in place", bench_in_place)]:
+        seconds = min(bench(document, ar_lines) for _ in range(REPEATS))
+        print(f"{name}: {seconds:.3f}s for {n_tokens} tokens ({seconds / n_tokens * 1e9:.0f} ns/token)")
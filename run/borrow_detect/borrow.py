@@ -1,7 +1,9 @@
-import pandas as pd
-from typing import Optional, Tuple, List, Dict, Set
+from typing import Optional, Tuple, List, Dict, Set, Iterable, Type
 from enum import Enum
+from threading import Lock, Thread
 from pre_train.aligner.transliterate import Ja2Ar
+from pre_train.generic.cache import LRUCache
+from run.borrow_detect.freq_index import FreqIndex
 
 MAIN_PATH = "run/borrow_detect/"
 CORPUS_PATH = MAIN_PATH + "corpora/"
@@ -13,11 +15,17 @@ class Lang(Enum):
     AM = 3
 
 
+def clear_word(word: str, legal_letters: str, translation_rules: Optional[Tuple[str, str]] = None) -> str:
+    # The cleaning rules of the corpora: the translation rules are applied, and then all the illegal letters are removed
+    replaced_word = word if translation_rules is None else word.translate(str.maketrans(*translation_rules))
+    return ''.join(l for l in replaced_word if l in legal_letters)
+
+
 class Corpus:
     _lang: str
     _legal_letters: str
     _translation_rules: Optional[Tuple[str, str]]
-    _corpus: pd.DataFrame
+    _corpus: FreqIndex
     _total_words: int
 
     def __init__(self, lang: str, legal_letters: str, translation_rules: Optional[Tuple[str, str]] = None):
@@ -29,27 +37,27 @@ class Corpus:
         self._total_words = self._calc_total_words()
 
     def _load(self) -> None:
-        self._corpus = pd.read_csv(
-            filepath_or_buffer=CORPUS_PATH + f"{self._lang}_clear.csv",
-            sep=",",
-            header=0,
-            dtype={"times": int, "word": str, "freq": float},
-            index_col="word"
+        self._corpus = FreqIndex.load(
+            csv_path=CORPUS_PATH + f"{self._lang}_clear.csv",
+            path=CORPUS_PATH + f"{self._lang}_clear.idx"
         )
 
     def _replace_chars(self, word: str) -> str:
         return word if self._translation_rules is None else word.translate(word.maketrans(*self._translation_rules))
 
     def _clear_word(self, word: str) -> str:
-        replaced_word = self._replace_chars(word)
-        return ''.join(l for l in replaced_word if l in self._legal_letters)
+        return clear_word(word, self._legal_letters, self._translation_rules)
+
+    def get_lexicon(self) -> FreqIndex:
+        # The (sorted) words of the corpus, walkable as a trie
+        return self._corpus
 
     def _calc_total_words(self) -> int:
-        return self._corpus["times"].sum()
+        return self._corpus.total_times
 
     def _is_word_in_corpus(self, word, replace_chars=True) -> bool:
         searched_word = self._replace_chars(word) if replace_chars is True else word
-        return searched_word in self._corpus.index
+        return searched_word in self._corpus
 
     def _smallest_freq(self) -> float:
         return 1 / self._total_words
@@ -62,9 +70,10 @@ class Corpus:
             raise ValueError(f"The word {word} does not exist in the {self._lang} language")
 
         searched_word = self._replace_chars(word) if replace_chars is True else word
-        if self._is_word_in_corpus(searched_word) is False:
+        times = self._corpus.times(searched_word)
+        if times == 0:
             return 0  # self._smallest_freq()
-        return self._corpus.loc[searched_word]["times"].sum() / self._total_words
+        return times / self._total_words
 
 
 class CorpusAr(Corpus):
@@ -79,29 +88,63 @@ class CorpusAr(Corpus):
 class CorpusAm(Corpus):
     LANG = Lang.AM.name.lower()
     LEGAL_LETTERS = "אבגדהוזחטיכלמנסעפצקרשתךםןףץ"
+    TRANSLATION_RULES = None
 
     def __init__(self):
-        super().__init__(self.LANG, self.LEGAL_LETTERS)
+        super().__init__(self.LANG, self.LEGAL_LETTERS, translation_rules=self.TRANSLATION_RULES)
 
 
 class CorpusHe(Corpus):
     LANG = Lang.HE.name.lower()
     LEGAL_LETTERS = "אבגדהוזחטיכלמנסעפצקרשתךםןףץ"
+    TRANSLATION_RULES = None
 
     def __init__(self):
-        super().__init__(self.LANG, self.LEGAL_LETTERS)
+        super().__init__(self.LANG, self.LEGAL_LETTERS, translation_rules=self.TRANSLATION_RULES)
 
 
 class FreqCalculator:
-    _CORPUS_MAP = {
-        Lang.AR: CorpusAr(),
-        Lang.HE: CorpusHe(),
-        Lang.AM: CorpusAm()
+    _CORPUS_CLASSES: Dict[Lang, Type[Corpus]] = {
+        Lang.AR: CorpusAr,
+        Lang.HE: CorpusHe,
+        Lang.AM: CorpusAm
     }
 
+    # Every corpus is loaded on its first use, and then shared by all the instances
+    _corpora: Dict[Lang, Corpus] = {}
+    _corpora_lock: Lock = Lock()
+
     def __init__(self):
         pass
 
+    @classmethod
+    def get_corpus(cls, lang: Lang) -> Corpus:
+        corpus = cls._corpora.get(lang)
+        if corpus is not None:
+            return corpus
+
+        with cls._corpora_lock:
+            if lang not in cls._corpora:
+                cls._corpora[lang] = cls._CORPUS_CLASSES[lang]()
+            return cls._corpora[lang]
+
+    @classmethod
+    def _prefetch(cls, langs: List[Lang]) -> None:
+        for lang in langs:
+            try:
+                cls.get_corpus(lang)
+            except FileNotFoundError as e:
+                print(f"Could not prefetch the {lang.name} corpus: {e}")
+
+    @classmethod
+    def prefetch(cls, langs: Optional[Iterable[Lang]] = None) -> Thread:
+        # Loads the corpora in a background thread, so the first borrow detection does not wait for them
+        langs = list(cls._CORPUS_CLASSES.keys()) if langs is None else list(langs)
+        thread = Thread(target=cls._prefetch, args=(langs,), name="corpora-prefetch", daemon=True)
+        thread.start()
+
+        return thread
+
     @staticmethod
     def _get_stem(word: str, lang: Lang, prefix_ar: str, prefix_ja: str) -> str:
         prefix = prefix_ar if lang == Lang.AR else prefix_ja
@@ -111,7 +154,7 @@ class FreqCalculator:
         return word[len(prefix):]
 
     def score(self, word: str, lang: Lang, prefix_ja: str, prefix_ar: Optional[str] = None) -> float:
-        corpus = self._CORPUS_MAP[lang]
+        corpus = self.get_corpus(lang)
         stem = self._get_stem(word, lang, prefix_ar, prefix_ja)
 
         freq_word, freq_stem = corpus.find_word_freq(word), corpus.find_word_freq(stem)
@@ -124,6 +167,10 @@ class FreqCalculator:
 class FreqComparator:
     LEGAL_AR_LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهويءةؤئى"
     FACTOR = 10**2
+    CACHE_SIZE = 2**16
+
+    # Shared by all the instances (and so by all the pipeline runs in the process), keyed by (prefix_ar, prefix_ja, word)
+    _CACHE = LRUCache(CACHE_SIZE)
 
     _word: Optional[str]
     _prefix_ar: Optional[str]
@@ -136,23 +183,42 @@ class FreqComparator:
         self._prefix_ja = None
         self._freq_calculator = FreqCalculator()
 
-    def _is_legal_ar_word(self, word):
-        return all(l in self.LEGAL_AR_LETTERS for l in word)
+    def _get_best_ar_score(self) -> Tuple[str, float]:
+        transliterate = Ja2Ar(self._word)
 
-    def _find_ar_transliterated_options(self) -> List[str]:
-        return [op.ar for op in Ja2Ar(self._word).get_transliterated_words() if self._is_legal_ar_word(op.ar) and op.ar.startswith(self._prefix_ar)]
+        # Only the options that are words of the AR corpus may have a positive score, so the options are generated
+        # along the corpus lexicon, and the rest of them are never expanded
+        lexicon = self._freq_calculator.get_corpus(Lang.AR).get_lexicon()
+        best_score: Optional[Tuple[str, float]] = None
+        for op in transliterate.iter_transliterated_words(prefix=self._prefix_ar, legal_letters=self.LEGAL_AR_LETTERS, lexicon=lexicon):
+            score = self._freq_calculator.score(op.ar, Lang.AR, self._prefix_ja, self._prefix_ar)
+            if best_score is None or score > best_score[1]:
+                best_score = (op.ar, score)
 
-    def _get_best_ar_score(self) -> Tuple[str, float]:
-        transliterated_options = self._find_ar_transliterated_options()
-        transliterated_scores = [(op, self._freq_calculator.score(op, Lang.AR, self._prefix_ja, self._prefix_ar))
-                                 for op in transliterated_options]
+        if best_score is not None and best_score[1] > 0:
+            return best_score
 
-        return max(transliterated_scores, key=lambda x: x[1])
+        # All the options score 0, so the best one is the first option (of all of them)
+        first_op = next(transliterate.iter_transliterated_words(prefix=self._prefix_ar, legal_letters=self.LEGAL_AR_LETTERS))
+        return first_op.ar, 0
 
     def _get_best_nar_score(self, lang: Lang) -> Tuple[str, float]:
         return self._word, self._freq_calculator.score(self._word, lang, self._prefix_ja)
 
-    def is_mixed(self, prefix_ar: str, prefix_ja: str, word: str):
+    @classmethod
+    def get_cache(cls) -> LRUCache:
+        return cls._CACHE
+
+    def is_mixed(self, prefix_ar: str, prefix_ja: str, word: str) -> bool:
+        key = (prefix_ar, prefix_ja, word)
+        result = self._CACHE.get(key)
+        if result is None:
+            result = self._is_mixed(prefix_ar, prefix_ja, word)
+            self._CACHE.put(key, result)
+
+        return result
+
+    def _is_mixed(self, prefix_ar: str, prefix_ja: str, word: str) -> bool:
         self._word = word
         self._prefix_ar = prefix_ar
         self._prefix_ja = prefix_ja
@@ -174,12 +240,3 @@ class FreqComparator:
 
 
 # print(FreqComparator("ال", "אל").is_mixed("אלסאן"))
-
-
-# print(self.total_words())
-# self._corpus = self._corpus.drop(columns=["freq"])
-# self._corpus["word"] = self._corpus["word"].apply(lambda w: self._clear_word(w))
-# self._corpus = self._corpus.groupby("word").sum().reset_index().sort_values(by="times", ascending=False)
-#
-# total_words = self.total_words()
-# self._corpus["freq"] = self._corpus["times"] / total_words
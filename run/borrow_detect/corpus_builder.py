@@ -0,0 +1,128 @@
+import csv
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from pre_train.editor.scrapes import ScrapeStore
+from run.borrow_detect.borrow import CORPUS_PATH, Lang, FreqCalculator, clear_word
+from run.borrow_detect.freq_index import FreqIndex
+
+Rules = Tuple[str, Optional[Tuple[str, str]]]
+
+
+def _iter_file_words(path: str, is_he: Optional[int]) -> Iterator[str]:
+    # A .csv file has a word column (and an is_he column, like the scrapes), any other file is plain text
+    if path.endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                if is_he is None or int(row["is_he"]) == is_he:
+                    yield from row["word"].split()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                yield from line.split()
+
+
+def _count(words: Iterable[str], rules: Rules) -> Counter:
+    legal_letters, translation_rules = rules
+    counts = Counter()
+    for word in words:
+        cleared_word = clear_word(word, legal_letters, translation_rules)
+        if cleared_word:
+            counts[cleared_word] += 1
+
+    return counts
+
+
+def _count_files(paths: List[str], rules: Rules, is_he: Optional[int]) -> Counter:
+    counts = Counter()
+    for path in paths:
+        counts.update(_count(_iter_file_words(path, is_he), rules))
+
+    return counts
+
+
+def _count_scrapes(store_path: str, paths: List[str], rules: Rules, is_he: Optional[int]) -> Counter:
+    # Every worker maps the store by itself, so only the paths are sent to it
+    store = ScrapeStore(store_path)
+    counts = Counter()
+    for path in paths:
+        words = (word for record_word, record_is_he in store.get_records(path)
+                 if is_he is None or record_is_he == is_he for word in record_word.split())
+        counts.update(_count(words, rules))
+
+    return counts
+
+
+class CorpusBuilder:
+    # Builds the {lang}_clear.csv frequency table of a corpus (and its compiled index) from text files or the
+    # scrapes: the sources are split into chunks that are counted in parallel, every worker with its own counter,
+    # and the counters are merged.
+    CHUNK_SIZE = 256
+
+    def __init__(self, lang: Lang, workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE):
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size should be positive, got {chunk_size}")
+
+        corpus_class = FreqCalculator._CORPUS_CLASSES[lang]
+        self._lang = lang
+        self._rules: Rules = (corpus_class.LEGAL_LETTERS, corpus_class.TRANSLATION_RULES)
+        self._workers = workers
+        self._chunk_size = chunk_size
+        self._counts = Counter()
+
+    def _chunks(self, items: List[str]) -> List[List[str]]:
+        return [items[i:i + self._chunk_size] for i in range(0, len(items), self._chunk_size)]
+
+    def _reduce(self, futures) -> None:
+        for future in futures:
+            self._counts.update(future.result())
+
+    def add_files(self, paths: Iterable[str], is_he: Optional[int] = None) -> "CorpusBuilder":
+        # is_he: only the words of the csv files with this is_he value are counted (None - all of them)
+        start_time = perf_counter()
+        paths = list(paths)
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            self._reduce([executor.submit(_count_files, chunk, self._rules, is_he) for chunk in self._chunks(paths)])
+        print(f"Counted {len(paths)} files in {perf_counter() - start_time:.1f}s")
+
+        return self
+
+    def add_dir(self, dir_path: str, suffix: str = ".txt", is_he: Optional[int] = None) -> "CorpusBuilder":
+        paths = []
+        for root, dirs, files in os.walk(dir_path):
+            paths.extend(os.path.join(root, file_name) for file_name in files if file_name.endswith(suffix))
+
+        return self.add_files(sorted(paths), is_he=is_he)
+
+    def add_scrapes(self, store_path: str, prefix: str = "", is_he: Optional[int] = None) -> "CorpusBuilder":
+        start_time = perf_counter()
+        paths = ScrapeStore(store_path).paths(prefix)
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            self._reduce([executor.submit(_count_scrapes, store_path, chunk, self._rules, is_he)
+                          for chunk in self._chunks(paths)])
+        print(f"Counted {len(paths)} scrapes in {perf_counter() - start_time:.1f}s")
+
+        return self
+
+    def get_counts(self) -> Counter:
+        return self._counts
+
+    def write(self, csv_path: Optional[str] = None, index_path: Optional[str] = None) -> None:
+        lang = self._lang.name.lower()
+        csv_path = csv_path or CORPUS_PATH + f"{lang}_clear.csv"
+        index_path = index_path or CORPUS_PATH + f"{lang}_clear.idx"
+
+        # The same layout as the existing tables (an index column, then word and times), the most frequent first
+        tmp_path = f"{csv_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["", "word", "times"])
+            for i, (word, times) in enumerate(self._counts.most_common()):
+                writer.writerow([i, word, times])
+        os.replace(tmp_path, csv_path)
+
+        FreqIndex.write(dict(self._counts), index_path)
+        print(f"Wrote {len(self._counts)} {lang.upper()} words ({sum(self._counts.values())} times) to {csv_path}")
@@ -0,0 +1,166 @@
+import csv
+import mmap
+import os
+import struct
+from zlib import crc32
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class FreqIndex:
+    # A compiled, read-only word -> times table, memory-mapped from a single file, so it is loaded instantly and the
+    # worker processes share one copy of it through the page cache.
+    #
+    # File layout (little-endian):
+    #   magic (8 bytes) | n_words (u32) | n_slots (u32) | total_times (u64)
+    #   counts:  n_words x u64        - times of every word, by the sorted order of the words
+    #   offsets: (n_words + 1) x u32  - the utf-8 bytes of word i are blob[offsets[i]:offsets[i+1]]
+    #   slots:   n_slots x u32        - open addressing hash table (crc32, linear probing) of word index + 1, 0 is empty
+    #   blob:    the utf-8 bytes of all the sorted words
+    MAGIC = b"JAFQIDX1"
+    HEADER = struct.Struct("<8sIIQ")
+
+    def __init__(self, path: str):
+        self._path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._n_words, n_slots, self._total_times = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"The file {path} is not a frequency index")
+
+        view = memoryview(self._mmap)
+        counts_start = self.HEADER.size
+        offsets_start = counts_start + 8 * self._n_words
+        slots_start = offsets_start + 4 * (self._n_words + 1)
+        blob_start = slots_start + 4 * n_slots
+
+        self._counts = view[counts_start:offsets_start].cast("Q")
+        self._offsets = view[offsets_start:slots_start].cast("I")
+        self._slots = view[slots_start:blob_start].cast("I")
+        self._blob = view[blob_start:]
+        self._mask = n_slots - 1
+
+    def __len__(self):
+        return self._n_words
+
+    def __contains__(self, word: str):
+        return self._find(word) >= 0
+
+    @property
+    def total_times(self) -> int:
+        return self._total_times
+
+    def _find(self, word: str) -> int:
+        key = word.encode("utf-8")
+        slot = crc32(key) & self._mask
+        while True:
+            entry = self._slots[slot]
+            if entry == 0:
+                return -1
+            if self._blob[self._offsets[entry - 1]:self._offsets[entry]] == key:
+                return entry - 1
+            slot = (slot + 1) & self._mask
+
+    def times(self, word: str) -> int:
+        i_word = self._find(word)
+        return 0 if i_word < 0 else self._counts[i_word]
+
+    def _word_bytes(self, i_word: int, length: int) -> bytes:
+        start = self._offsets[i_word]
+        return bytes(self._blob[start:min(start + length, self._offsets[i_word + 1])])
+
+    def _bisect(self, key: bytes, lo: int, hi: int, right: bool) -> int:
+        # Binary search by the first len(key) bytes of the (sorted) words
+        while lo < hi:
+            mid = (lo + hi) // 2
+            word_start = self._word_bytes(mid, len(key))
+            if word_start < key or (right and word_start == key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    # The sorted word table is walked as an implicit trie: a node is the range of the words that share its prefix
+    def root(self) -> Tuple[int, int, bytes]:
+        return 0, self._n_words, b""
+
+    def step(self, node: Tuple[int, int, bytes], text: str) -> Optional[Tuple[int, int, bytes]]:
+        if not text:
+            return node
+
+        lo, hi, prefix = node
+        prefix += text.encode("utf-8")
+        lo = self._bisect(prefix, lo, hi, right=False)
+        hi = self._bisect(prefix, lo, hi, right=True)
+
+        return (lo, hi, prefix) if lo < hi else None
+
+    def is_word(self, node: Tuple[int, int, bytes]) -> bool:
+        lo, hi, prefix = node
+        return lo < hi and self._offsets[lo + 1] - self._offsets[lo] == len(prefix)
+
+    def words(self) -> Iterator[str]:
+        for i_word in range(self._n_words):
+            yield bytes(self._blob[self._offsets[i_word]:self._offsets[i_word + 1]]).decode("utf-8")
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        for i_word, word in enumerate(self.words()):
+            yield word, self._counts[i_word]
+
+    @staticmethod
+    def read_csv(csv_path: str) -> Dict[str, int]:
+        # Reads a {lang}_clear.csv table (columns: word, times). Repeated words are summed.
+        word_times: Dict[str, int] = {}
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                word = row["word"]
+                if not word:
+                    continue
+                word_times[word] = word_times.get(word, 0) + int(row["times"])
+
+        return word_times
+
+    @classmethod
+    def write(cls, word_times: Dict[str, int], path: str) -> None:
+        words = sorted(word_times.keys())
+        keys = [word.encode("utf-8") for word in words]
+
+        n_slots = 1
+        while n_slots < 2 * len(keys):
+            n_slots *= 2
+        mask = n_slots - 1
+
+        offsets = [0]
+        for key in keys:
+            offsets.append(offsets[-1] + len(key))
+
+        slots = [0] * n_slots
+        for i_word, key in enumerate(keys):
+            slot = crc32(key) & mask
+            while slots[slot] != 0:
+                slot = (slot + 1) & mask
+            slots[slot] = i_word + 1
+
+        # Written to a temporary file and renamed, so a concurrent reader never sees a partial index
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, len(keys), n_slots, sum(word_times.values())))
+            f.write(struct.pack(f"<{len(words)}Q", *(word_times[word] for word in words)))
+            f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            f.write(struct.pack(f"<{n_slots}I", *slots))
+            f.write(b"".join(keys))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def build(cls, csv_path: str, path: str) -> None:
+        cls.write(cls.read_csv(csv_path), path)
+
+    @classmethod
+    def load(cls, csv_path: str, path: str) -> "FreqIndex":
+        # Compiles the index from the CSV if it is missing or older than the CSV
+        if os.path.exists(csv_path) is False and os.path.exists(path) is False:
+            raise FileNotFoundError(f"Neither the corpus {csv_path} nor its index {path} exist")
+        if os.path.exists(csv_path) and (os.path.exists(path) is False or os.path.getmtime(path) < os.path.getmtime(csv_path)):
+            cls.build(csv_path, path)
+
+        return cls(path)
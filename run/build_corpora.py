@@ -0,0 +1,45 @@
+import argparse
+import os
+
+from pre_train.editor.scrapes import ScrapeStore
+from run.borrow_detect.borrow import Lang
+from run.borrow_detect.corpus_builder import CorpusBuilder
+
+# Rebuilds the *_clear.csv corpora (and their indices): the HE corpus from the HE words of the scrapes, and the AR
+# corpus from a directory of .txt files in arabic letters.
+#
+#   python -m run.build_corpora --ar-texts <directory of AR .txt files>
+#   python -m run.build_corpora --lang he
+SCRAPES_PATH = "resources/scrapes/"
+STORE_PATH = "resources/scrapes.pack"
+LANGS = ["he", "ar"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuilds the HE and AR corpora of the borrow detector")
+    parser.add_argument("--lang", choices=LANGS + ["all"], default="all", help="the corpora to rebuild")
+    parser.add_argument("--ar-texts", default=None,
+                        help="a directory of .txt files in arabic letters, to build the AR corpus from")
+    parser.add_argument("--scrapes", default=SCRAPES_PATH, help="the scrapes tree, to build the HE corpus from")
+    parser.add_argument("--store", default=STORE_PATH, help="the packed scrapes store (built if it is missing)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    args = parser.parse_args()
+
+    langs = LANGS if args.lang == "all" else [args.lang]
+    if "ar" in langs:
+        if args.ar_texts is None:
+            parser.error("the AR corpus is built from --ar-texts <directory>, or pass --lang he to build only the HE one")
+        if os.path.isdir(args.ar_texts) is False:
+            parser.error(f"--ar-texts {args.ar_texts} is not a directory")
+
+    if "he" in langs:
+        ScrapeStore.load(args.scrapes, args.store)
+        # The HE words of the scrapes
+        CorpusBuilder(Lang.HE, workers=args.workers).add_scrapes(args.store, is_he=1).write()
+
+    if "ar" in langs:
+        CorpusBuilder(Lang.AR, workers=args.workers).add_dir(args.ar_texts).write()
+
+
+if __name__ == "__main__":
+    main()
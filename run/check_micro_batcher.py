@@ -0,0 +1,36 @@
+from typing import List, Tuple
+
+from run.server import MicroBatcher
+
+# Checks that a request that fails does not fail the other requests of its batch: a few good requests and a bad one
+# are submitted together, so they are gathered into one batch, and only the bad one should get the error. The pipeline
+# is replaced by a fake one (that fails on BAD_LINE), so no model is loaded.
+BAD_LINE = "bad"
+N_GOOD_REQUESTS = 4
+MAX_WAIT = 0.5
+
+
+class FakeMicroBatcher(MicroBatcher):
+    def _run_lines(self, lines: List[str]) -> List[Tuple[str, str]]:
+        if BAD_LINE in lines:
+            raise ValueError(f"Can not transliterate {BAD_LINE!r}")
+        return [(line, line[::-1]) for line in lines]
+
+
+if __name__ == "__main__":
+    batcher = FakeMicroBatcher(max_wait=MAX_WAIT)
+
+    good_lines = [[f"line {i}", f"another line {i}"] for i in range(N_GOOD_REQUESTS)]
+    good_futures = [batcher.submit(lines) for lines in good_lines[:2]]
+    bad_future = batcher.submit(["line", BAD_LINE])
+    good_futures += [batcher.submit(lines) for lines in good_lines[2:]]
+
+    for lines, future in zip(good_lines, good_futures):
+        assert future.result() == [(line, line[::-1]) for line in lines], future.result()
+    assert isinstance(bad_future.exception(), ValueError), bad_future.exception()
+
+    stats = batcher.get_stats()
+    assert stats["batches"] == 1, f"the requests were not gathered into one batch: {stats}"
+    assert stats["requests"] == N_GOOD_REQUESTS + 1, stats
+    assert stats["queue_depth"] == 0, stats
+    print(f"The bad request failed, and the other {N_GOOD_REQUESTS} requests of its batch succeeded")
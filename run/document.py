@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+from array import array
+from enum import Enum
+from sys import intern
+from typing import Iterator, List, Tuple, Union
+
+
+class Word:
+    class Lang(Enum):
+        AR = 1,
+        NAR = 2,  # Non-Arabic (Hebrew, Aramaic)
+        MIX = 3,  # Stem in Hebrew, Article in Arabic
+        TBD = 4,  # To Be Decided
+
+    _LABEL_TO_LANG_MAP = {
+        "B-JA": Lang.AR,
+        "B-NJA": Lang.NAR
+    }
+
+    __slots__ = ("_original_word", "_processed_word", "_lang")
+
+    def __init__(self, original_word: str, result_word: str, lang: Lang):
+        self._original_word: str = original_word
+        self._processed_word: str = result_word
+        self._lang: Word.Lang = lang
+
+    def __repr__(self):
+        return f"<Word: {self._original_word}, {self._processed_word}, {self._lang.name}>"
+
+    def __deepcopy__(self, memo) -> Word:
+        # All the fields are immutable, so a new Word with the same fields is a deep copy
+        return Word(self._original_word, self._processed_word, self._lang)
+
+    @property
+    def original_word(self) -> str:
+        return self._original_word
+
+    @property
+    def processed_word(self) -> str:
+        return self._processed_word
+
+    @property
+    def lang(self) -> Lang:
+        return self._lang
+
+    @original_word.setter
+    def original_word(self, value: str):
+        self._original_word = value
+
+    @processed_word.setter
+    def processed_word(self, value: str):
+        self._processed_word = value
+
+    @lang.setter
+    def lang(self, value: Word.Lang):
+        self._lang = value
+
+    @staticmethod
+    def convert_label(label: str) -> Lang:
+        if label not in Word._LABEL_TO_LANG_MAP.keys():
+            raise KeyError(f"label {label} is unknown")
+
+        return Word._LABEL_TO_LANG_MAP[label]
+
+
+class WordView:
+    # A Word of a Document: reading and setting its properties reads and sets the document's columns
+    __slots__ = ("_document", "_i_word")
+
+    def __init__(self, document: Document, i_word: int):
+        self._document = document
+        self._i_word = i_word
+
+    def __repr__(self):
+        return f"<Word: {self.original_word}, {self.processed_word}, {self.lang.name}>"
+
+    def __deepcopy__(self, memo) -> Word:
+        # A copy of a view is a detached Word, that does not change with the document
+        return Word(self.original_word, self.processed_word, self.lang)
+
+    @property
+    def original_word(self) -> str:
+        return self._document.get_original(self._i_word)
+
+    @property
+    def processed_word(self) -> str:
+        return self._document.get_processed(self._i_word)
+
+    @property
+    def lang(self) -> Word.Lang:
+        return self._document.get_lang(self._i_word)
+
+    @processed_word.setter
+    def processed_word(self, value: str):
+        self._document.set_processed(self._i_word, value)
+
+    @lang.setter
+    def lang(self, value: Word.Lang):
+        self._document.set_lang(self._i_word, value)
+
+
+class LineView:
+    # The words of a line of a Document, as a read-only sequence of WordViews
+    __slots__ = ("_document", "_start", "_end")
+
+    def __init__(self, document: Document, start: int, end: int):
+        self._document = document
+        self._start = start
+        self._end = end
+
+    def __len__(self):
+        return self._end - self._start
+
+    def __getitem__(self, i_word: Union[int, slice]) -> Union[WordView, List[WordView]]:
+        if isinstance(i_word, slice):
+            return [self[i] for i in range(*i_word.indices(len(self)))]
+
+        if i_word < 0:
+            i_word += len(self)
+        if i_word < 0 or i_word >= len(self):
+            raise IndexError(f"word index {i_word} is out of range")
+
+        return WordView(self._document, self._start + i_word)
+
+    def __iter__(self) -> Iterator[WordView]:
+        for i_word in range(self._start, self._end):
+            yield WordView(self._document, i_word)
+
+    def __repr__(self):
+        return f"<Line: {list(self)}>"
+
+
+class Document:
+    # The words of a text in a columnar form: the original words, the processed words and the languages of all the
+    # lines, each in one flat column, and where every line starts in them. The words are interned, so every repeated
+    # word is stored once, and the languages are kept as one byte per word. The stages update the columns in place,
+    # and Word objects are only created as views (or copies) on demand.
+    _LANGS: List[Word.Lang] = list(Word.Lang)
+    _LANG_CODES = {lang: code for code, lang in enumerate(_LANGS)}
+
+    __slots__ = ("_original", "_processed", "_lang", "_line_starts")
+
+    def __init__(self, words: List[str], line_starts: List[int]):
+        if len(line_starts) == 0 or line_starts[0] != 0 or line_starts[-1] != len(words):
+            raise ValueError("line_starts should start with 0 and end with the number of words")
+
+        self._original: List[str] = [intern(word) for word in words]
+        self._processed: List[str] = [""] * len(words)
+        self._lang = bytearray([self._LANG_CODES[Word.Lang.TBD]]) * len(words)
+        self._line_starts = array("I", line_starts)
+
+    @classmethod
+    def from_lines(cls, lines: List[str]) -> Document:
+        words, line_starts = [], [0]
+        for line in lines:
+            words.extend(line.split())
+            line_starts.append(len(words))
+
+        return cls(words, line_starts)
+
+    def __len__(self):
+        return len(self._line_starts) - 1
+
+    def __getitem__(self, i_line: int) -> LineView:
+        return LineView(self, *self.line_range(i_line))
+
+    def __iter__(self) -> Iterator[LineView]:
+        for i_line in range(len(self)):
+            yield self[i_line]
+
+    def __repr__(self):
+        return f"<Document: {len(self)} lines, {self.n_words()} words>"
+
+    def n_words(self) -> int:
+        return len(self._original)
+
+    def line_range(self, i_line: int) -> Tuple[int, int]:
+        # The flat indices [start, end) of the words of the line
+        if i_line < 0:
+            i_line += len(self)
+        if i_line < 0 or i_line >= len(self):
+            raise IndexError(f"line index {i_line} is out of range")
+
+        return self._line_starts[i_line], self._line_starts[i_line + 1]
+
+    def line_words(self, i_line: int) -> List[str]:
+        start, end = self.line_range(i_line)
+        return self._original[start:end]
+
+    def line_text(self, i_line: int) -> str:
+        return ' '.join(self.line_words(i_line))
+
+    def line_langs(self, i_line: int) -> List[Word.Lang]:
+        start, end = self.line_range(i_line)
+        return [self._LANGS[code] for code in self._lang[start:end]]
+
+    def line_processed_text(self, i_line: int) -> str:
+        start, end = self.line_range(i_line)
+        return ' '.join(self._processed[start:end])
+
+    def get_original(self, i_word: int) -> str:
+        return self._original[i_word]
+
+    def get_processed(self, i_word: int) -> str:
+        return self._processed[i_word]
+
+    def get_lang(self, i_word: int) -> Word.Lang:
+        return self._LANGS[self._lang[i_word]]
+
+    def set_processed(self, i_word: int, value: str) -> None:
+        self._processed[i_word] = value
+
+    def set_lang(self, i_word: int, value: Word.Lang) -> None:
+        self._lang[i_word] = self._LANG_CODES[value]
+
+    def set_line_processed(self, i_line: int, lang: Word.Lang, processed_words: List[str]) -> None:
+        # Sets the processed words of the words of the line in the given language, by their order. There should be
+        # exactly one processed word per word in the language, otherwise nothing is set and a ValueError is raised.
+        start, end = self.line_range(i_line)
+        code = self._LANG_CODES[lang]
+        n_words = self._lang.count(code, start, end)
+        if n_words != len(processed_words):
+            raise ValueError(f"line {i_line} has {n_words} {lang.name} words, got {len(processed_words)} processed words")
+
+        i_processed = 0
+        for i_word in range(start, end):
+            if self._lang[i_word] == code:
+                self._processed[i_word] = processed_words[i_processed]
+                i_processed += 1
+
+    def set_word(self, i_word: int, processed_word: str, lang: Word.Lang) -> None:
+        self._processed[i_word] = processed_word
+        self._lang[i_word] = self._LANG_CODES[lang]
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import re
+import zipfile
+from datetime import datetime
+from io import BytesIO
+from typing import Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from docx import Document as DocxDocument
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.table import WD_TABLE_ALIGNMENT
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Pt, Cm
+
+LinePair = Tuple[str, str]  # (JA input, transliterated output)
+
+
+class DocxStreamWriter:
+    # Writes the transliteration table as a .docx, row by row. python-docx slows down as its table grows, and keeps
+    # the whole document in memory, so it only lays out a template once per process: the heading, the header row, one
+    # row of markers and the footer. Every part of the template is copied as is into the new file, except for
+    # word/document.xml, that is streamed into the zip: the template up to the marker row, the row for every line (the
+    # marker row with the line's texts), and the rest of the template. The memory does not depend on the number of rows.
+    DOCUMENT_PART = "word/document.xml"
+    AR_MARKER = "@@AR@@"
+    JA_MARKER = "@@JA@@"
+    NUMBER_MARKER = "@@NUMBER@@"
+    START_TIME_MARKER = "@@START_TIME@@"
+    END_TIME_MARKER = "@@END_TIME@@"
+    TIME_FORMAT = '%d/%m/%Y %H:%M:%S.%f'
+    ROWS_PER_WRITE = 256
+
+    # Characters that are not allowed in XML (python-docx refuses them as well)
+    ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+    RUN_BREAKS = re.compile(r"([\t\r\n])")
+
+    # (the parts of the template, the document part up to the rows, the row split by its markers, the rest)
+    _template: Optional[Tuple[List[Tuple[zipfile.ZipInfo, bytes]], str, List[str], str]] = None
+
+    @classmethod
+    def _build_template_document(cls) -> DocxDocument:
+        document = DocxDocument()
+
+        h = document.add_heading('Judeo-Arabic Text Transliteration', 0)
+        h.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+        table = document.add_table(rows=1, cols=3, style="Table Grid")
+        table.autofit = False
+        table.allow_autofit = False
+        table.alignment = WD_TABLE_ALIGNMENT.CENTER
+        table.columns[0].width = Cm(7)
+        table.rows[0].cells[0].width = Cm(7)
+        table.columns[1].width = Cm(7)
+        table.rows[0].cells[1].width = Cm(7)
+        table.columns[2].width = Cm(1)
+        table.rows[0].cells[2].width = Cm(1)
+
+        hdr_cells = table.rows[0].cells
+        hdr_cells[0].text = 'Transliterated'
+        hdr_cells[1].text = 'JA'
+        hdr_cells[2].text = '#'
+        row_cells = table.add_row().cells
+        row_cells[0].text = cls.AR_MARKER
+        row_cells[1].text = cls.JA_MARKER
+        row_cells[2].text = cls.NUMBER_MARKER
+
+        for i, row in enumerate(table.rows):
+            for cell in row.cells:
+                cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.RIGHT if i > 0 else WD_ALIGN_PARAGRAPH.CENTER
+
+        obj_styles = document.styles
+        obj_charstyle = obj_styles.add_style('CommentsStyle', WD_STYLE_TYPE.CHARACTER)
+        obj_font = obj_charstyle.font
+        obj_font.size = Pt(8)
+        obj_font.name = 'Times New Roman'
+
+        document.add_paragraph()
+
+        p = document.add_paragraph()
+        p.add_run(f"Start time: {cls.START_TIME_MARKER}", style="CommentsStyle")
+        p.add_run().add_break()
+        p.add_run(f"End time:  {cls.END_TIME_MARKER}", style="CommentsStyle")
+
+        p = document.add_paragraph()
+        p.add_run('This tool has been created by ', style="CommentsStyle")
+        p.add_run('Daniel Weisberg Mitelman', style="CommentsStyle").bold = True
+        p.add_run(' with the supervision of ', style="CommentsStyle")
+        p.add_run('Dr. Kfir Bar', style="CommentsStyle").bold = True
+        p.add_run(' and ', style="CommentsStyle")
+        p.add_run('Prof. Nachum Dershowitz', style="CommentsStyle").bold = True
+        p.add_run('.', style="CommentsStyle")
+
+        document.add_page_break()
+
+        return document
+
+    @classmethod
+    def _load_template(cls) -> Tuple[List[Tuple[zipfile.ZipInfo, bytes]], str, List[str], str]:
+        if cls._template is not None:
+            return cls._template
+
+        template_file = BytesIO()
+        cls._build_template_document().save(template_file)
+        with zipfile.ZipFile(template_file) as template_zip:
+            parts = [(info, template_zip.read(info)) for info in template_zip.infolist()]
+
+        document_xml = next(data for info, data in parts if info.filename == cls.DOCUMENT_PART).decode("utf-8")
+        i_marker = document_xml.index(cls.AR_MARKER)
+        i_row_start = document_xml.rindex("<w:tr>", 0, i_marker)
+        i_row_end = document_xml.index("</w:tr>", i_marker) + len("</w:tr>")
+
+        # The runs of the markers are replaced by the runs of the texts, as python-docx would have written them
+        row_xml = document_xml[i_row_start:i_row_end]
+        row_pieces = re.split("|".join(
+            re.escape(f"<w:r><w:t>{marker}</w:t></w:r>") for marker in (cls.AR_MARKER, cls.JA_MARKER, cls.NUMBER_MARKER)
+        ), row_xml)
+        if len(row_pieces) != 4:
+            raise RuntimeError("The row of markers of the template is not as expected")
+
+        cls._template = (parts, document_xml[:i_row_start], row_pieces, document_xml[i_row_end:])
+        return cls._template
+
+    @classmethod
+    def _run_xml(cls, text: str) -> str:
+        # A run as python-docx writes it: tabs and line breaks are elements, and the texts around them keep their
+        # leading and trailing spaces
+        if cls.ILLEGAL_XML_CHARS.search(text) is not None:
+            raise ValueError(f"The text contains characters that are not allowed in XML: {text!r}")
+        if text == "":
+            return "<w:r/>"
+
+        run_content = []
+        for piece in cls.RUN_BREAKS.split(text):
+            if piece == "\t":
+                run_content.append("<w:tab/>")
+            elif piece in ("\r", "\n"):
+                run_content.append("<w:br/>")
+            elif piece != "":
+                space = ' xml:space="preserve"' if len(piece.strip()) < len(piece) else ""
+                run_content.append(f"<w:t{space}>{escape(piece)}</w:t>")
+
+        return f"<w:r>{''.join(run_content)}</w:r>"
+
+    @classmethod
+    def _row_xml(cls, row_pieces: List[str], i: int, ja_line: str, ar_line: str) -> str:
+        return ''.join((
+            row_pieces[0], cls._run_xml(ar_line),
+            row_pieces[1], cls._run_xml(ja_line),
+            row_pieces[2], cls._run_xml(str(i)),
+            row_pieces[3]
+        ))
+
+    @classmethod
+    def write(cls, path: str, lines: Iterable[LinePair], global_start_time: datetime) -> None:
+        parts, document_head, row_pieces, document_tail = cls._load_template()
+
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as docx_zip:
+            for info, data in parts:
+                if info.filename != cls.DOCUMENT_PART:
+                    docx_zip.writestr(info, data)
+                    continue
+
+                document_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                document_info.compress_type = zipfile.ZIP_DEFLATED
+                with docx_zip.open(document_info, "w") as f:
+                    f.write(document_head.encode("utf-8"))
+
+                    rows = []
+                    for i, (ja_line, ar_line) in enumerate(lines, start=1):
+                        rows.append(cls._row_xml(row_pieces, i, ja_line, ar_line))
+                        if len(rows) == cls.ROWS_PER_WRITE:
+                            f.write(''.join(rows).encode("utf-8"))
+                            rows.clear()
+                    f.write(''.join(rows).encode("utf-8"))
+
+                    start_time_str = global_start_time.strftime(cls.TIME_FORMAT)[:-3]
+                    end_time_str = datetime.now().strftime(cls.TIME_FORMAT)[:-3]
+                    f.write(document_tail.replace(cls.START_TIME_MARKER, start_time_str)
+                            .replace(cls.END_TIME_MARKER, end_time_str).encode("utf-8"))
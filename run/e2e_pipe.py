@@ -1,22 +1,17 @@
 from __future__ import annotations
 
-from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification
-from typing import List, Optional, Any, Tuple, Dict
-from enum import Enum
-from copy import deepcopy
-from docx import Document
-from docx.shared import Pt, Cm
+from typing import List, Optional, Any, Tuple, Dict, Iterable, Iterator, Type, Union
+from itertools import islice
+from docx import Document as DocxDocument
 from datetime import datetime
-from docx.enum.style import WD_STYLE_TYPE
-from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from googleapiclient.discovery import build
-from google.oauth2 import service_account
-from googleapiclient.http import MediaFileUpload
+from time import perf_counter
 import requests
 import re
 
 from run.borrow_detect.borrow import FreqComparator
+from run.model_registry import ModelRegistry
+from run.document import Word, Document
+from run.sinks import ExportSink, FileSink, ListSink, TxtSink, TsvSink, JsonlSink, DocxSink, DriveSink
 
 AR_LABEL = "B-JA"
 text = [
@@ -29,58 +24,6 @@ text = [
 ]
 
 
-class Word:
-    class Lang(Enum):
-        AR = 1,
-        NAR = 2,  # Non-Arabic (Hebrew, Aramaic)
-        MIX = 3,  # Stem in Hebrew, Article in Arabic
-        TBD = 4,  # To Be Decided
-
-    _LABEL_TO_LANG_MAP = {
-        "B-JA": Lang.AR,
-        "B-NJA": Lang.NAR
-    }
-
-    def __init__(self, original_word: str, result_word: str, lang: Lang):
-        self._original_word: str = original_word
-        self._processed_word: str = result_word
-        self._lang: Word.Lang = lang
-
-    def __repr__(self):
-        return f"<Word: {self._original_word}, {self._processed_word}, {self._lang.name}>"
-
-    @property
-    def original_word(self) -> str:
-        return self._original_word
-
-    @property
-    def processed_word(self) -> str:
-        return self._processed_word
-
-    @property
-    def lang(self) -> Lang:
-        return self._lang
-
-    @original_word.setter
-    def original_word(self, value: str):
-        self._original_word = value
-
-    @processed_word.setter
-    def processed_word(self, value: str):
-        self._processed_word = value
-
-    @lang.setter
-    def lang(self, value: Word.Lang):
-        self._lang = value
-
-    @staticmethod
-    def convert_label(label: str) -> Lang:
-        if label not in Word._LABEL_TO_LANG_MAP.keys():
-            raise KeyError(f"label {label} is unknown")
-
-        return Word._LABEL_TO_LANG_MAP[label]
-
-
 class Task:
     _start_time: Optional[datetime]
     _end_time: Optional[datetime]
@@ -104,12 +47,12 @@ class Task:
 
 class PrePipeline(Task):
     _in: List[str]
-    _out: List[List[Word]]
+    _out: Union[List[str], Document]
 
     def __init__(self):
         super().__init__()
 
-    def _process(self) -> List[List[Word]]:
+    def _process(self) -> Union[List[str], Document]:
         raise NotImplementedError
 
     def output(self):
@@ -118,35 +61,137 @@ class PrePipeline(Task):
 
 
 class InPipeline(Task):
-    TASK_NAME = "token-classification"
-    _in: List[List[Word]]
-    _out: List[List[Word]]
+    # Lines longer than MAX_LEN are split on word boundaries into windows, and every window gets up to CONTEXT_LEN
+    # characters of the neighbouring words as context (their labels are dropped when the windows are stitched)
+    CONTEXT_LEN = 64
+
+    _in: Document
+    _out: Document
     _model_name: str
+    _batch_size: Optional[int]
+    _nn_tokens: int
+    _nn_seconds: float
 
-    def __init__(self, inp: List[List[Word]], model_name: Optional[str] = None):
+    def __init__(self, inp: Document, model_name: Optional[str] = None, batch_size: Optional[int] = None):
         super().__init__()
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError(f"batch_size should be positive, got {batch_size}")
+
         self._in = inp
         self._model_name = model_name
+        self._batch_size = batch_size
+        self._nn_tokens = 0
+        self._nn_seconds = 0.0
+
+    def _run_nn_batched(self, pipe, input_nn: List[str]) -> List[List[Dict]]:
+        # Lines of similar length are batched together, so the padding of every batch stays small
+        order = sorted(range(len(input_nn)), key=lambda i: len(input_nn[i]))
+        nn_output: List[Optional[List[Dict]]] = [None] * len(input_nn)
+
+        for i_batch in range(0, len(order), self._batch_size):
+            batch = order[i_batch:i_batch + self._batch_size]
+            batch_output = pipe([input_nn[i] for i in batch], batch_size=self._batch_size)
+            for i, line_output in zip(batch, batch_output):
+                nn_output[i] = line_output
+
+        return nn_output
+
+    def _context_start(self, words: List[str], i_core_start: int) -> int:
+        i_first, context_len = i_core_start, 0
+        while i_first > 0 and context_len + len(words[i_first - 1]) + 1 <= self.CONTEXT_LEN + 1:
+            context_len += len(words[i_first - 1]) + 1
+            i_first -= 1
+
+        return i_first
+
+    def _context_end(self, words: List[str], i_core_end: int) -> int:
+        i_last, context_len = i_core_end, 0
+        while i_last < len(words) and context_len + len(words[i_last]) + 1 <= self.CONTEXT_LEN + 1:
+            context_len += len(words[i_last]) + 1
+            i_last += 1
+
+        return i_last
+
+    def _split_to_windows(self, line: str) -> List[Tuple[str, Optional[Tuple[int, int]]]]:
+        # Returns (window text, range of the window's words that belong to it and not to its context)
+        if len(line) <= self.MAX_LEN:
+            return [(line, None)]
+
+        words = line.split()
+        core_len = self.MAX_LEN - 2 * (self.CONTEXT_LEN + 1)
+
+        cores: List[Tuple[int, int]] = []
+        i_core_start, curr_len = 0, -1
+        for i_word, word in enumerate(words):
+            if i_word > i_core_start and curr_len + 1 + len(word) > core_len:
+                cores.append((i_core_start, i_word))
+                i_core_start, curr_len = i_word, -1
+            curr_len += 1 + len(word)
+        cores.append((i_core_start, len(words)))
+
+        windows = []
+        for i_core_start, i_core_end in cores:
+            i_first = self._context_start(words, i_core_start)
+            i_last = self._context_end(words, i_core_end)
+            windows.append((' '.join(words[i_first:i_last]), (i_core_start - i_first, i_core_end - i_first)))
+
+        return windows
+
+    def _keep_window_words(self, tokens: List[Dict], i_keep_start: int, i_keep_end: int) -> List[Dict]:
+        kept_tokens = []
+        i_word = -1
+        for token in tokens:
+            if self._is_internal_token(token["word"]) is False:
+                i_word += 1
+            if i_keep_start <= i_word < i_keep_end:
+                kept_tokens.append(token)
+
+        return kept_tokens
+
+    def _run_nn(self, input_nn: List[str]) -> List[List[Dict]]:
+        pipe = ModelRegistry.get(self._model_name)
+
+        windows: List[Tuple[str, Optional[Tuple[int, int]]]] = []
+        window_lines: List[int] = []
+        for i_line, line in enumerate(input_nn):
+            for window in self._split_to_windows(line):
+                windows.append(window)
+                window_lines.append(i_line)
+        windows_input = [window_text for window_text, _ in windows]
+
+        start_time = perf_counter()
+        windows_output = pipe(windows_input) if self._batch_size is None else self._run_nn_batched(pipe, windows_input)
+        self._nn_seconds += perf_counter() - start_time
+        self._nn_tokens += sum(len(window_output) for window_output in windows_output)
+
+        if len(windows) == len(input_nn):
+            return windows_output
+
+        # Stitching the windows back to their lines
+        nn_output: List[List[Dict]] = [[] for _ in input_nn]
+        for i_line, (_, keep_range), window_output in zip(window_lines, windows, windows_output):
+            nn_output[i_line].extend(window_output if keep_range is None else self._keep_window_words(window_output, *keep_range))
 
-    def _run_nn(self, input_nn: List[str]) -> List[Dict]:
-        model = AutoModelForTokenClassification.from_pretrained(self._model_name)
-        tokenizer = AutoTokenizer.from_pretrained(self._model_name)
-        pipe = pipeline(task=self.TASK_NAME, model=model, tokenizer=tokenizer)
+        return nn_output
 
-        return pipe(input_nn)
+    def get_nn_stats(self) -> Tuple[int, float]:
+        return self._nn_tokens, self._nn_seconds
+
+    def get_tokens_per_sec(self) -> float:
+        return self._nn_tokens / self._nn_seconds if self._nn_seconds > 0 else 0.0
 
     def output(self):
         return self._out
 
 
 class PostPipeline(Task):
-    _in: List[List[Word]]
+    _in: Document
 
-    def __init__(self, inp: List[List[Word]]):
+    def __init__(self, inp: Document):
         super().__init__()
         self._in = inp
 
-    def _process(self) -> List[List[Word]]:
+    def _process(self) -> Document:
         raise NotImplementedError
 
 
@@ -187,11 +232,22 @@ class Import(PrePipeline):
 
         self._out = self._split_text(response.content.decode("utf-8"))
 
+    def by_txt_file(self, file_path: str) -> None:
+        with open(file_path, "r", encoding="utf-8") as f:
+            self._out = self._split_text(f.read())
+
+    def by_docx_file(self, file_path: str) -> None:
+        # A local .docx file, every paragraph is a line
+        self._out = [paragraph.text for paragraph in DocxDocument(file_path).paragraphs]
+
     def output(self):
         return self._out
 
 
 class ClearText(PrePipeline):
+    # Everything that is not a HE letter or a whitespace is deleted from the whole text by a single regex pass
+    NON_HE_PATTERN = re.compile(r"[^אבגדהוזחטיכלמנסעפצקרשתךםןףץ\s]+")
+
     _in: List[str]
     _out: List[str]
 
@@ -200,11 +256,13 @@ class ClearText(PrePipeline):
         self._in = text
         self._out = self._process()
 
-    def _clear_word(self, word) -> str:
-        return ''.join(l for l in word if l in self.HE_LETTERS)
-
     def _clear_text(self, text) -> List[str]:
-        return [' '.join(self._clear_word(word) for word in line.strip().split()) for line in text]
+        cleared_lines = self.NON_HE_PATTERN.sub("", "\n".join(text)).split("\n")
+        if len(cleared_lines) != len(text):
+            # Some of the lines contain line breaks of their own, so they are cleared one by one
+            cleared_lines = [self.NON_HE_PATTERN.sub("", line) for line in text]
+
+        return [' '.join(line.split()) for line in cleared_lines]
 
     def _process(self) -> List[str]:
         return self._clear_text(self._in)
@@ -214,25 +272,29 @@ class ClearText(PrePipeline):
 
 
 class WrapText(PrePipeline):
+    _out: Document
+
     def __init__(self, text: List[str]):
         super().__init__()
 
         self._in = text
         self._out = self._process()
 
-    def _process(self) -> List[List[Word]]:
-        return [[Word(word, "", Word.Lang.TBD) for word in line.split()] for line in self._in]
+    def _process(self) -> Document:
+        return Document.from_lines(self._in)
 
 
 class CodeSwitch(InPipeline):
     MODEL_NAME = "dwmit/ja_classification"
 
-    def __init__(self, inp: List[List[Word]]):
-        super().__init__(inp, model_name=self.MODEL_NAME)
+    _in: Document
+
+    def __init__(self, inp: Document, batch_size: Optional[int] = None):
+        super().__init__(inp, model_name=self.MODEL_NAME, batch_size=batch_size)
         self._out = self._process()
 
-    def _merge_tokens(self, tokens: Dict) -> List[Word]:
-        words: List[Word] = []
+    def _merge_tokens(self, tokens: Dict) -> List[Tuple[str, Word.Lang]]:
+        words: List[Tuple[str, Word.Lang]] = []
         curr_word = ""
         curr_label = ""
 
@@ -242,43 +304,46 @@ class CodeSwitch(InPipeline):
                 curr_word += sub_word[2:]
             else:
                 if len(curr_word) > 0:
-                    resulted_word = curr_word if Word.convert_label(curr_label) == Word.Lang.NAR else ""
-                    words.append(Word(original_word=curr_word, result_word=resulted_word, lang=Word.convert_label(curr_label)))
+                    words.append((curr_word, Word.convert_label(curr_label)))
                     # init
                     curr_word = ""
                 curr_word += sub_word
                 curr_label = lang
 
         if len(curr_word) > 0:
-            resulted_word = curr_word if Word.convert_label(curr_label) == Word.Lang.NAR else ""
-            words.append(Word(original_word=curr_word, result_word=resulted_word, lang=Word.convert_label(curr_label)))
+            words.append((curr_word, Word.convert_label(curr_label)))
 
         return words
 
-    def _process(self) -> List[List[Word]]:
-        processed_lines = []
-
-        nn_input = [' '.join(word.original_word for word in line) for line in self._in]
+    def _process(self) -> Document:
+        nn_input = [self._in.line_text(i_line) for i_line in range(len(self._in))]
         nn_output = self._run_nn(nn_input)
 
         assert len(nn_output) == len(self._in)
         for i_line in range(len(nn_output)):
             line_output = nn_output[i_line]
             line_result = self._merge_tokens(line_output)
-            assert len(line_result) == len(self._in[i_line])
+            line_words = self._in.line_words(i_line)
+            assert len(line_result) == len(line_words)
             assert all(
-                line_result[i_word].original_word == self._in[i_line][i_word].original_word
-                for i_word, word in enumerate(self._in[i_line])
+                line_result[i_word][0] == word
+                for i_word, word in enumerate(line_words)
             )
-            processed_lines.append(line_result)
 
-        return processed_lines
+            # The languages (and the NAR words, that are kept as they are) are written into the document
+            start, _ = self._in.line_range(i_line)
+            for i_word, (original_word, lang) in enumerate(line_result):
+                self._in.set_word(start + i_word, original_word if lang == Word.Lang.NAR else "", lang)
+
+        return self._in
 
 
 class BorrowDetector(InPipeline):
     # Detect only words that start with an article (AL) but their stem is in Hebrew
     AR_SUBLINE_PRINT = "ـ"
 
+    _in: Document
+
     PREFIXES = [
         ("ال", "אל"),
         ("لل", "לל"),
@@ -287,22 +352,21 @@ class BorrowDetector(InPipeline):
 
     _freq_comparator: FreqComparator
 
-    def __init__(self, inp: List[List[Word]]):
-        super().__init__(inp)
+    def __init__(self, inp: Document, batch_size: Optional[int] = None):
+        super().__init__(inp, batch_size=batch_size)
         self._freq_comparator = FreqComparator()
         self._out = self._process()
 
-    def _process(self) -> List[List[Word]]:
-        for i_line, line in enumerate(self._in):
-            for i_word, word in enumerate(line):
-                for prefix_ar, prefix_ja in self.PREFIXES:
-                    if word.original_word.startswith(prefix_ja) is False or \
-                       len(word.original_word) - len(prefix_ja) <= 2 or \
-                       self._freq_comparator.is_mixed(prefix_ar, prefix_ja, word.original_word) is False:
-                        continue
-                    stem = word.original_word[len(prefix_ja):]
-                    word.processed_word = prefix_ar + self.AR_SUBLINE_PRINT + stem
-                    word.lang = Word.Lang.MIX
+    def _process(self) -> Document:
+        for i_word in range(self._in.n_words()):
+            original_word = self._in.get_original(i_word)
+            for prefix_ar, prefix_ja in self.PREFIXES:
+                if original_word.startswith(prefix_ja) is False or \
+                   len(original_word) - len(prefix_ja) <= 2 or \
+                   self._freq_comparator.is_mixed(prefix_ar, prefix_ja, original_word) is False:
+                    continue
+                stem = original_word[len(prefix_ja):]
+                self._in.set_word(i_word, prefix_ar + self.AR_SUBLINE_PRINT + stem, Word.Lang.MIX)
 
         return self._in
 
@@ -310,12 +374,15 @@ class BorrowDetector(InPipeline):
 class Transliterate(InPipeline):
     MODEL_NAME = "dwmit/transliterate"
 
-    def __init__(self, inp: List[List[Word]]):
-        super().__init__(inp, model_name=self.MODEL_NAME)
+    _in: Document
+
+    def __init__(self, inp: Document, batch_size: Optional[int] = None):
+        super().__init__(inp, model_name=self.MODEL_NAME, batch_size=batch_size)
         self._out = self._process()
 
-    def _merge_tokens(self, tokens: Dict) -> List[Word]:
-        words: List[Word] = []
+    def _merge_tokens(self, tokens: Dict) -> List[Tuple[str, str]]:
+        # (HE word, AR word) of every word of the line
+        words: List[Tuple[str, str]] = []
         curr_word_he, curr_word_ar = "", ""
 
         for token in tokens:
@@ -326,46 +393,36 @@ class Transliterate(InPipeline):
             else:
                 assert len(letter_he) == 1
                 if len(curr_word_he) > 0:
-                    words.append(Word(original_word=curr_word_he, result_word=curr_word_ar, lang=Word.Lang.AR))
+                    words.append((curr_word_he, curr_word_ar))
                     curr_word_he, curr_word_ar = "", ""
                 curr_word_he += letter_he
                 curr_word_ar += letter_ar
 
         if len(curr_word_he) > 0:
-            words.append(Word(original_word=curr_word_he, result_word=curr_word_ar, lang=Word.Lang.AR))
+            words.append((curr_word_he, curr_word_ar))
 
         return words
 
     @staticmethod
-    def _merge_ar_he(original_line: List[Word], ar_line: List[Word]):
-        merged_line = []
-
-        i_ar = 0
-        for original_word in original_line:
-            if original_word.lang == Word.Lang.AR:
-                merged_line.append(deepcopy(ar_line[i_ar]))
-                i_ar += 1
-            else:
-                merged_line.append(deepcopy(original_word))
-
-        return merged_line
-
-    def _process(self) -> List[List[Word]]:
-        processed_lines = []
-
-        nn_input = [' '.join(word.original_word for word in line if word.lang == Word.Lang.AR) for line in self._in]
+    def _merge_ar_he(document: Document, i_line: int, ar_line: List[Tuple[str, str]]) -> None:
+        # Ownership: the task owns its input document, and writes the transliteration of the AR words of the line into
+        # it, in place; the other words are left as they are. Nothing is copied, so the caller should not keep using
+        # the document as the input of another run. A line whose NN output does not have a word per AR word raises.
+        document.set_line_processed(i_line, Word.Lang.AR, [word_ar for _, word_ar in ar_line])
+
+    def _process(self) -> Document:
+        nn_input = [
+            ' '.join(word for word, lang in zip(self._in.line_words(i_line), self._in.line_langs(i_line)) if lang == Word.Lang.AR)
+            for i_line in range(len(self._in))
+        ]
         nn_output = self._run_nn(nn_input)
 
         assert len(nn_output) == len(self._in)
         for i_line in range(len(nn_output)):
-            line_input = self._in[i_line]
-            line_output = nn_output[i_line]
-            line_result = self._merge_tokens(line_output)
-            line_merged = self._merge_ar_he(line_input, line_result)
-            assert len(line_merged) == len(line_input)
-            processed_lines.append(line_merged)
+            line_result = self._merge_tokens(nn_output[i_line])
+            self._merge_ar_he(self._in, i_line, line_result)
 
-        return processed_lines
+        return self._in
 
 
 class SpellingMistakeDetector(InPipeline):
@@ -374,145 +431,49 @@ class SpellingMistakeDetector(InPipeline):
 
 
 class Export(PostPipeline):
-    CREDENTIALS_JSON = "global_def/docx-read-7b56daaf11c4.json"
-    LEGAL_OUTPUT_FORMATS = [
-        "by_docx_path",
-        "by_list_str"
-    ]
+    # The output formats and their sinks, a new format is added by registering its ExportSink here
+    SINKS: Dict[str, Type[ExportSink]] = {
+        "by_docx_path": DriveSink,
+        "by_list_str": ListSink,
+        "by_docx_file": DocxSink,
+        "by_txt_file": TxtSink,
+        "by_tsv_file": TsvSink,
+        "by_jsonl_file": JsonlSink
+    }
+    LEGAL_OUTPUT_FORMATS = list(SINKS.keys())
 
-    _out: str
+    _out: Any
     _global_start_time: datetime
 
-    def __init__(self, inp: List[List[Word]], *args, **kwargs):
+    def __init__(self, inp: Document, *args, **kwargs):
         super().__init__(inp)
         if "global_start_time" not in kwargs:
             raise KeyError("global_start_time hasn't been passed to Export task")
-        if "output_format" not in kwargs:
+        if "output_format" not in kwargs and "sink" not in kwargs:
             raise KeyError("output_format hasn't been passed to Export task")
 
         self._global_start_time = kwargs["global_start_time"]
-        self._output_format = kwargs["output_format"]
-
-        if self._output_format == "by_docx_path":
-            self._out = self._create_docx()
-        elif self._output_format == "by_list_str":
-            self._out = self._create_list()
-        else:
-            raise KeyError(f"output_format {self._output_format} not legal, options: {self.LEGAL_OUTPUT_FORMATS}")
-
-    def _create_list(self):
-        return [
-            (
-                ' '.join([word.original_word for word in sentence]),
-                ' '.join([word.processed_word for word in sentence])
-            )
-            for sentence in self._in
-        ]
-
-    def _create_docx(self):
-        document = Document()
-
-        h = document.add_heading('Judeo-Arabic Text Transliteration', 0)
-        h.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        table = document.add_table(rows=1, cols=3, style="Table Grid")
-        table.autofit = False
-        table.allow_autofit = False
-        table.alignment = WD_TABLE_ALIGNMENT.CENTER
-        table.columns[0].width = Cm(7)
-        table.rows[0].cells[0].width = Cm(7)
-        table.columns[1].width = Cm(7)
-        table.rows[0].cells[1].width = Cm(7)
-        table.columns[2].width = Cm(1)
-        table.rows[0].cells[2].width = Cm(1)
-
-        hdr_cells = table.rows[0].cells
-        hdr_cells[0].text = 'Transliterated'
-        hdr_cells[1].text = 'JA'
-        hdr_cells[2].text = '#'
-        for i, line in enumerate(self._in):
-            row_cells = table.add_row().cells
-            row_cells[0].text = ' '.join(word.processed_word for word in line)
-            row_cells[1].text = ' '.join(word.original_word for word in line)
-            row_cells[2].text = str(i+1)
-
-        for i, row in enumerate(table.rows):
-            for cell in row.cells:
-                cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.RIGHT if i > 0 else WD_ALIGN_PARAGRAPH.CENTER
-
-        obj_styles = document.styles
-        obj_charstyle = obj_styles.add_style('CommentsStyle', WD_STYLE_TYPE.CHARACTER)
-        obj_font = obj_charstyle.font
-        obj_font.size = Pt(8)
-        obj_font.name = 'Times New Roman'
-
-        document.add_paragraph()
-
-        p = document.add_paragraph()
-        p.add_run(f"Start time: {self._global_start_time.strftime('%d/%m/%Y %H:%M:%S.%f')[:-3]}", style="CommentsStyle")
-        p.add_run().add_break()
-        p.add_run(f"End time:  {datetime.now().strftime('%d/%m/%Y %H:%M:%S.%f')[:-3]}", style="CommentsStyle")
-
-        p = document.add_paragraph()
-        p.add_run('This tool has been created by ', style="CommentsStyle")
-        p.add_run('Daniel Weisberg Mitelman', style="CommentsStyle").bold = True
-        p.add_run(' with the supervision of ', style="CommentsStyle")
-        p.add_run('Dr. Kfir Bar', style="CommentsStyle").bold = True
-        p.add_run(' and ', style="CommentsStyle")
-        p.add_run('Prof. Nachum Dershowitz', style="CommentsStyle").bold = True
-        p.add_run('.', style="CommentsStyle")
-
-        document.add_page_break()
-
-        file_path = 'demo.docx'
-
-        document.save(file_path)
-
-        credentials = service_account.Credentials.from_service_account_file(
-            self.CREDENTIALS_JSON,
-            scopes=['https://www.googleapis.com/auth/drive', 'https://www.googleapis.com/auth/documents']
-        )
-
-        drive_service = build('drive', 'v3', credentials=credentials)
-
-        final_file_name = f'{datetime.now().strftime("%Y-%m-%d_%H:%M:%S_%f")[:-3]} - JA Transliteration'
-        file_metadata = {
-            'name': 'My Document'
-        }
-        media = MediaFileUpload(file_path,
-                                mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-        uploaded_file = drive_service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id'
-        ).execute()
-
-        drive_file_id = uploaded_file['id']
-        conversion_response = drive_service.files().copy(
-            fileId=drive_file_id,
-            body={
-                'parents': [],
-                'mimeType': 'application/vnd.google-apps.document',
-                'name': final_file_name
-            }
-        ).execute()
-
-        converted_doc_id = conversion_response['id']
-
-        permission_body = {
-            'role': 'writer',
-            'type': 'anyone',
-            'allowFileDiscovery': False,
-        }
-        response = drive_service.permissions().create(
-            fileId=converted_doc_id,
-            body=permission_body,
-            fields='id'
-        ).execute()
-
-        doc_url = f'https://docs.google.com/document/d/{converted_doc_id}/edit'
-
-        return doc_url
+        self._output_format = kwargs.get("output_format")
+
+        # A sink that is passed explicitly wins over the output format
+        sink = kwargs.get("sink")
+        if sink is None:
+            sink = self.make_sink(self._output_format, output_path=kwargs.get("output_path"),
+                                  output_dir=kwargs.get("output_dir"))
+        self._out = sink.write(self._in, self._global_start_time)
+
+    @classmethod
+    def make_sink(cls, output_format: str, output_path: Optional[str] = None,
+                  output_dir: Optional[str] = None) -> ExportSink:
+        # output_path and output_dir are only used by the local file formats, without them every export goes to a new
+        # unique file in the current directory
+        if output_format not in cls.SINKS:
+            raise KeyError(f"output_format {output_format} not legal, options: {cls.LEGAL_OUTPUT_FORMATS}")
+
+        sink_class = cls.SINKS[output_format]
+        if issubclass(sink_class, FileSink):
+            return sink_class(path=output_path, output_dir=output_dir)
+        return sink_class()
 
     def output(self):
         return self._out
@@ -521,9 +482,11 @@ class Export(PostPipeline):
 class PipelineManager:
     _in: List[str]
     _pre_pipeline: List[str]
-    _in_pipeline: List[List[Word]]
-    _post_pipeline: List[List[Word]]
+    _in_pipeline: Document
+    _post_pipeline: Document
     _out: str
+    _batch_size: Optional[int]
+    _nn_stats: Dict[str, Tuple[int, float]]
 
     PRE_PIPELINE_TASKS = [
         ClearText,
@@ -537,32 +500,108 @@ class PipelineManager:
     POST_PIPELINE_TASKS = [
         Export
     ]
+    STREAM_CHUNK_SIZE = 64
 
-    def __init__(self, inp: List[str], output_format: str = "by_docx_path"):
+    def __init__(self, inp: List[str], output_format: str = "by_docx_path", batch_size: Optional[int] = None,
+                 output_path: Optional[str] = None, output_dir: Optional[str] = None, print_stats: bool = False):
         self._in = inp
         self._global_start_time = datetime.now()
         self._output_format = output_format
+        self._output_path = output_path
+        self._output_dir = output_dir
+        self._batch_size = batch_size
+        self._print_stats = print_stats
+        self._nn_stats = {}
 
         self._process()
 
-    def _process_pre_pipeline(self) -> List[List[Word]]:
-        for task in self.PRE_PIPELINE_TASKS[:-1]:
-            self._pre_pipeline = task(self._pre_pipeline).output()
+    @staticmethod
+    def preload_models() -> None:
+        ModelRegistry.preload([CodeSwitch.MODEL_NAME, Transliterate.MODEL_NAME])
+
+    @staticmethod
+    def evict_models() -> None:
+        ModelRegistry.evict()
 
-        return self.PRE_PIPELINE_TASKS[-1](self._pre_pipeline).output()
+    @classmethod
+    def _run_pre_pipeline(cls, inp: List[str]) -> Document:
+        pre_pipeline = inp
+        for task in cls.PRE_PIPELINE_TASKS:
+            pre_pipeline = task(pre_pipeline).output()
 
-    def _process_in_pipeline(self) -> List[List[Word]]:
-        for task in self.IN_PIPELINE_TASKS:
-            self._in_pipeline = task(self._in_pipeline).output()
+        return pre_pipeline
 
-        return self._in_pipeline
+    @classmethod
+    def _run_in_pipeline(cls, inp: Document, batch_size: Optional[int],
+                         nn_stats: Dict[str, Tuple[int, float]]) -> Document:
+        in_pipeline = inp
+        for task in cls.IN_PIPELINE_TASKS:
+            task_run = task(in_pipeline, batch_size=batch_size)
+            in_pipeline = task_run.output()
+            cls._add_nn_stats(nn_stats, task.__name__, task_run)
+
+        return in_pipeline
+
+    @staticmethod
+    def _add_nn_stats(nn_stats: Dict[str, Tuple[int, float]], task_name: str, task_run: InPipeline) -> None:
+        tokens, seconds = task_run.get_nn_stats()
+        if tokens == 0:
+            return
+
+        prev_tokens, prev_seconds = nn_stats.get(task_name, (0, 0.0))
+        nn_stats[task_name] = (prev_tokens + tokens, prev_seconds + seconds)
+
+    @staticmethod
+    def print_nn_stats(nn_stats: Dict[str, Tuple[int, float]]) -> None:
+        for task_name, (tokens, seconds) in nn_stats.items():
+            tokens_per_sec = tokens / seconds if seconds > 0 else 0.0
+            print(f"{task_name}: {tokens} tokens in {seconds:.2f}s ({tokens_per_sec:.1f} tokens/sec)")
+
+    @classmethod
+    def stream(cls, inp: Iterable[str], chunk_size: int = STREAM_CHUNK_SIZE, batch_size: Optional[int] = None,
+               nn_stats: Optional[Dict[str, Tuple[int, float]]] = None) -> Iterator[Tuple[str, str]]:
+        # Every chunk of lines passes all the stages before the next chunk is read, so the memory is bounded by
+        # chunk_size and not by the input size. Yields (JA input, transliterated output) per line, by the input order.
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size should be positive, got {chunk_size}")
+
+        nn_stats = {} if nn_stats is None else nn_stats
+        lines = iter(inp)
+        while True:
+            chunk = list(islice(lines, chunk_size))
+            if len(chunk) == 0:
+                return
+
+            yield from cls.run_lines(chunk, batch_size=batch_size, nn_stats=nn_stats)
+
+    @classmethod
+    def run_lines(cls, inp: List[str], batch_size: Optional[int] = None,
+                  nn_stats: Optional[Dict[str, Tuple[int, float]]] = None) -> List[Tuple[str, str]]:
+        # All the stages over the lines at once, returns (JA input, transliterated output) per line
+        nn_stats = {} if nn_stats is None else nn_stats
+        in_pipeline = cls._run_pre_pipeline(inp)
+        post_pipeline = cls._run_in_pipeline(in_pipeline, batch_size, nn_stats)
+
+        return Export(post_pipeline, global_start_time=datetime.now(), output_format="by_list_str").output()
+
+    def _process_pre_pipeline(self) -> Document:
+        return self._run_pre_pipeline(self._pre_pipeline)
+
+    def _process_in_pipeline(self) -> Document:
+        in_pipeline = self._run_in_pipeline(self._in_pipeline, self._batch_size, self._nn_stats)
+        if self._print_stats:
+            self.print_nn_stats(self._nn_stats)
+
+        return in_pipeline
 
     def _process_post_pipeline(self) -> str:
         for task in self.POST_PIPELINE_TASKS:
             self._out = task(
                 self._post_pipeline,
                 global_start_time=self._global_start_time,
-                output_format=self._output_format
+                output_format=self._output_format,
+                output_path=self._output_path,
+                output_dir=self._output_dir
             ).output()
 
         return self._out
@@ -575,3 +614,7 @@ class PipelineManager:
 
     def output(self):
         return self._out
+
+    def get_nn_stats(self) -> Dict[str, Tuple[int, float]]:
+        # Per NN stage: (number of tokens, seconds spent in inference)
+        return self._nn_stats
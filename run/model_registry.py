@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+
+from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification, Pipeline
+
+
+class ModelRegistry:
+    # Process-wide store of the NN pipelines: every model is loaded (and warmed up) only once per process,
+    # and all the tasks that use the same model name get the same pipeline object.
+    TASK_NAME = "token-classification"
+    WARMUP_INPUT = ["אלדי"]
+
+    _pipelines: Dict[str, Pipeline] = {}
+    _lock: Lock = Lock()  # guards the dicts, and is never held while a model loads
+    _load_locks: Dict[str, Lock] = {}
+
+    @classmethod
+    def _load(cls, model_name: str) -> Pipeline:
+        model = AutoModelForTokenClassification.from_pretrained(model_name)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        pipe = pipeline(task=cls.TASK_NAME, model=model, tokenizer=tokenizer)
+
+        # The first call pays for lazy initializations, so it is done here and not on the user's input
+        pipe(cls.WARMUP_INPUT)
+
+        return pipe
+
+    @classmethod
+    def get(cls, model_name: str) -> Pipeline:
+        if model_name is None:
+            raise ValueError("model_name hasn't been passed to the model registry")
+
+        # A model that is already loaded is returned without waiting for the loads of other models
+        pipe = cls._pipelines.get(model_name)
+        if pipe is not None:
+            return pipe
+
+        with cls._lock:
+            load_lock = cls._load_locks.setdefault(model_name, Lock())
+
+        # Only the callers of the same model wait for its load, and it is loaded once
+        with load_lock:
+            pipe = cls._pipelines.get(model_name)
+            if pipe is None:
+                pipe = cls._load(model_name)
+                with cls._lock:
+                    cls._pipelines[model_name] = pipe
+
+            return pipe
+
+    @classmethod
+    def preload(cls, model_names: Iterable[str]) -> None:
+        for model_name in model_names:
+            cls.get(model_name)
+
+    @classmethod
+    def evict(cls, model_name: Optional[str] = None) -> None:
+        # Evicts the given model, or all the models if no name is given
+        with cls._lock:
+            if model_name is None:
+                cls._pipelines.clear()
+            else:
+                cls._pipelines.pop(model_name, None)
+
+    @classmethod
+    def is_loaded(cls, model_name: str) -> bool:
+        return model_name in cls._pipelines
+
+    @classmethod
+    def loaded_models(cls) -> List[str]:
+        return list(cls._pipelines.keys())
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import argparse
+import json
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Empty, Queue
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Deque, Dict, List, Optional, Tuple
+
+from run.borrow_detect.borrow import FreqCalculator
+from run.e2e_pipe import PipelineManager
+
+
+class _Request:
+    __slots__ = ("lines", "future", "enqueue_time")
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+        self.future: Future = Future()
+        self.enqueue_time = perf_counter()
+
+
+class MicroBatcher:
+    # Gathers the requests that arrive together into one pipeline run: the first waiting request opens a batch, and
+    # requests join it until it has max_batch_lines lines or max_wait seconds passed. A single worker thread runs the
+    # batches, so the models are never used by two threads at once. If a batch fails, its requests are run again one by
+    # one, so only the requests that fail by themselves get the error.
+    MAX_WAIT = 0.01
+    MAX_BATCH_LINES = 256
+    LATENCY_WINDOW = 1000
+
+    def __init__(self, max_wait: float = MAX_WAIT, max_batch_lines: int = MAX_BATCH_LINES,
+                 batch_size: Optional[int] = None):
+        if max_wait < 0:
+            raise ValueError(f"max_wait should not be negative, got {max_wait}")
+        if max_batch_lines <= 0:
+            raise ValueError(f"max_batch_lines should be positive, got {max_batch_lines}")
+
+        self._max_wait = max_wait
+        self._max_batch_lines = max_batch_lines
+        self._batch_size = batch_size
+
+        self._queue: Queue = Queue()
+        self._next: Optional[_Request] = None
+        self._latencies: Deque[float] = deque(maxlen=self.LATENCY_WINDOW)
+        self._lock = Lock()  # guards _next and the stats, that get_stats reads from the server threads
+        self._n_requests = 0
+        self._n_lines = 0
+        self._n_batches = 0
+        self._nn_stats: Dict[str, Tuple[int, float]] = {}
+
+        self._worker = Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, lines: List[str]) -> Future:
+        request = _Request(lines)
+        self._queue.put(request)
+        return request.future
+
+    def transliterate(self, lines: List[str]) -> List[Tuple[str, str]]:
+        return self.submit(lines).result()
+
+    def _next_request(self, timeout: Optional[float]) -> Optional[_Request]:
+        # A request that did not fit into the previous batch opens the next one
+        with self._lock:
+            if self._next is not None:
+                request, self._next = self._next, None
+                return request
+
+        try:
+            return self._queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def _gather(self) -> List[_Request]:
+        batch = [self._next_request(timeout=None)]
+        n_lines = len(batch[0].lines)
+        deadline = perf_counter() + self._max_wait
+        while n_lines < self._max_batch_lines:
+            request = self._next_request(timeout=max(deadline - perf_counter(), 0))
+            if request is None:
+                break
+            if n_lines + len(request.lines) > self._max_batch_lines:
+                with self._lock:
+                    self._next = request
+                break
+            batch.append(request)
+            n_lines += len(request.lines)
+
+        return batch
+
+    def _run_lines(self, lines: List[str]) -> List[Tuple[str, str]]:
+        if len(lines) == 0:
+            return []
+
+        nn_stats: Dict[str, Tuple[int, float]] = {}
+        results = PipelineManager.run_lines(lines, batch_size=self._batch_size, nn_stats=nn_stats)
+        with self._lock:
+            for task_name, (tokens, seconds) in nn_stats.items():
+                prev_tokens, prev_seconds = self._nn_stats.get(task_name, (0, 0.0))
+                self._nn_stats[task_name] = (prev_tokens + tokens, prev_seconds + seconds)
+
+        return results
+
+    def _run_one_by_one(self, batch: List[_Request]) -> None:
+        for request in batch:
+            try:
+                request.future.set_result(self._run_lines(request.lines))
+            except Exception as e:
+                request.future.set_exception(e)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._gather()
+            lines = [line for request in batch for line in request.lines]
+            try:
+                results = self._run_lines(lines)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0].future.set_exception(e)
+                else:
+                    self._run_one_by_one(batch)
+            else:
+                i_line = 0
+                for request in batch:
+                    request.future.set_result(results[i_line:i_line + len(request.lines)])
+                    i_line += len(request.lines)
+
+            end_time = perf_counter()
+            with self._lock:
+                self._latencies.extend(end_time - request.enqueue_time for request in batch)
+                self._n_requests += len(batch)
+                self._n_lines += len(lines)
+                self._n_batches += 1
+
+    @staticmethod
+    def _percentile(values: List[float], percent: float) -> float:
+        # Nearest-rank percentile of sorted values
+        if len(values) == 0:
+            return 0.0
+        return values[min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "queue_depth": self._queue.qsize() + (self._next is not None),
+                "requests": self._n_requests,
+                "lines": self._n_lines,
+                "batches": self._n_batches,
+                "mean_batch_lines": self._n_lines / self._n_batches if self._n_batches > 0 else 0.0,
+                "latency_ms": {
+                    f"p{percent}": 1000 * self._percentile(latencies, percent) for percent in (50, 90, 95, 99)
+                },
+                "nn": {
+                    task_name: {"tokens": tokens, "seconds": seconds}
+                    for task_name, (tokens, seconds) in self._nn_stats.items()
+                }
+            }
+
+
+class TransliterationHandler(BaseHTTPRequestHandler):
+    # POST /transliterate {"lines": [str, ...]} -> {"lines": [[JA input, transliterated output], ...]}
+    # GET /stats -> the queue depth, the latency percentiles (of the recent requests) and the NN throughput
+    batcher: MicroBatcher
+
+    def _send_json(self, status: int, body: Dict) -> None:
+        content = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.batcher.get_stats())
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/transliterate":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8"))
+        except ValueError as e:
+            self._send_json(400, {"error": f"Expected a JSON body: {e}"})
+            return
+
+        lines = body.get("lines") if isinstance(body, dict) else None
+        if (isinstance(lines, list) and all(isinstance(line, str) for line in lines)) is False:
+            self._send_json(400, {"error": "Expected to receive {\"lines\": [str]}"})
+            return
+
+        try:
+            results = self.batcher.transliterate(lines)
+        except Exception as e:
+            self._send_json(500, {"error": repr(e)})
+            return
+
+        self._send_json(200, {"lines": [list(result) for result in results]})
+
+    def log_message(self, format, *args):
+        # Every request is counted in /stats, so they are not logged one by one
+        pass
+
+
+class TransliterationServer(ThreadingHTTPServer):
+    # Every connection is served on its own thread, and an editor may open many of them at once
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def make_server(host: str, port: int, batcher: MicroBatcher) -> TransliterationServer:
+    handler = type("BoundTransliterationHandler", (TransliterationHandler,), {"batcher": batcher})
+    return TransliterationServer((host, port), handler)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="A local transliteration server, that keeps the models resident")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-wait-ms", type=float, default=1000 * MicroBatcher.MAX_WAIT,
+                        help="how long a batch waits for more requests")
+    parser.add_argument("--max-batch-lines", type=int, default=MicroBatcher.MAX_BATCH_LINES,
+                        help="the maximal number of lines of a batch")
+    parser.add_argument("--batch-size", type=int, default=None, help="the batch size of the NN inference")
+    args = parser.parse_args()
+
+    print("Loading the models and the corpora...")
+    FreqCalculator.prefetch()
+    PipelineManager.preload_models()
+
+    batcher = MicroBatcher(max_wait=args.max_wait_ms / 1000, max_batch_lines=args.max_batch_lines,
+                           batch_size=args.batch_size)
+    server = make_server(args.host, args.port, batcher)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from run.document import Document
+from run.docx_stream import DocxStreamWriter
+
+LinePair = Tuple[str, str]  # (JA input, transliterated output)
+
+
+def document_lines(document: Document) -> Iterator[LinePair]:
+    for i_line in range(len(document)):
+        yield document.line_text(i_line), document.line_processed_text(i_line)
+
+
+class ExportSink:
+    # Where the transliterated lines go. write() takes a whole document, and write_lines() takes the (JA input,
+    # transliterated output) pairs one by one, so a sink that does not need all of them at once can write a stream.
+    def write(self, document: Document, global_start_time: datetime) -> Any:
+        return self.write_lines(document_lines(document), global_start_time)
+
+    def write_lines(self, lines: Iterable[LinePair], global_start_time: datetime) -> Any:
+        raise NotImplementedError
+
+
+class ListSink(ExportSink):
+    def write_lines(self, lines: Iterable[LinePair], global_start_time: datetime) -> List[LinePair]:
+        return list(lines)
+
+
+class FileSink(ExportSink):
+    # A local file: the given path, or a new unique path (in output_dir, the current directory by default) for every
+    # write, so concurrent runs never overwrite each other. The file is written atomically, and its path is returned.
+    SUFFIX = ""
+    FILE_NAME = "JA Transliteration"
+
+    def __init__(self, path: Optional[str] = None, output_dir: Optional[str] = None):
+        self._path = path
+        self._output_dir = output_dir
+
+    def new_path(self) -> str:
+        if self._path is not None:
+            return self._path
+
+        time_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S_%f")[:-3]
+        return os.path.join(self._output_dir or ".", f"{time_str}_{uuid4().hex[:8]} - {self.FILE_NAME}{self.SUFFIX}")
+
+    def write_lines(self, lines: Iterable[LinePair], global_start_time: datetime) -> str:
+        path = self.new_path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.{uuid4().hex[:8]}.tmp"
+        try:
+            self._write_file(tmp_path, lines, global_start_time)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return path
+
+    def _write_file(self, path: str, lines: Iterable[LinePair], global_start_time: datetime) -> None:
+        raise NotImplementedError
+
+
+class TxtSink(FileSink):
+    # A transliterated line per input line
+    SUFFIX = ".txt"
+
+    def _write_file(self, path: str, lines: Iterable[LinePair], global_start_time: datetime) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for _, ar_line in lines:
+                f.write(ar_line + "\n")
+
+
+class TsvSink(FileSink):
+    # The line number, the JA input and the transliterated output of every line (the words never contain tabs)
+    SUFFIX = ".tsv"
+    HEADER = ("#", "JA", "Transliterated")
+
+    def _write_file(self, path: str, lines: Iterable[LinePair], global_start_time: datetime) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('\t'.join(self.HEADER) + "\n")
+            for i, (ja_line, ar_line) in enumerate(lines, start=1):
+                f.write(f"{i}\t{ja_line}\t{ar_line}\n")
+
+
+class JsonlSink(FileSink):
+    SUFFIX = ".jsonl"
+
+    def _write_file(self, path: str, lines: Iterable[LinePair], global_start_time: datetime) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for i, (ja_line, ar_line) in enumerate(lines, start=1):
+                f.write(json.dumps({"line": i, "ja": ja_line, "ar": ar_line}, ensure_ascii=False) + "\n")
+
+
+class DocxSink(FileSink):
+    # The transliteration table: the transliterated output, the JA input and the line number, right to left. The rows
+    # are streamed into the file, so large books are written quickly and in a bounded memory.
+    SUFFIX = ".docx"
+
+    def _write_file(self, path: str, lines: Iterable[LinePair], global_start_time: datetime) -> None:
+        DocxStreamWriter.write(path, lines, global_start_time)
+
+
+class DriveSink(ExportSink):
+    # The .docx table as a shared Google Doc: it is written to a temporary directory, uploaded to Google Drive,
+    # converted to a Google Doc and opened to anyone with the link. Returns the link.
+    # The Google client libraries are only needed by this sink.
+    CREDENTIALS_JSON = "global_def/docx-read-7b56daaf11c4.json"
+    SCOPES = ['https://www.googleapis.com/auth/drive', 'https://www.googleapis.com/auth/documents']
+    DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+    def __init__(self, credentials_json: str = CREDENTIALS_JSON):
+        self._credentials_json = credentials_json
+
+    def write_lines(self, lines: Iterable[LinePair], global_start_time: datetime) -> str:
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+        from googleapiclient.http import MediaFileUpload
+
+        credentials = service_account.Credentials.from_service_account_file(self._credentials_json, scopes=self.SCOPES)
+        drive_service = build('drive', 'v3', credentials=credentials)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = DocxSink(path=os.path.join(tmp_dir, f"{FileSink.FILE_NAME}{DocxSink.SUFFIX}")).write_lines(
+                lines, global_start_time
+            )
+
+            final_file_name = f'{datetime.now().strftime("%Y-%m-%d_%H:%M:%S_%f")[:-3]} - JA Transliteration'
+            file_metadata = {
+                'name': 'My Document'
+            }
+            media = MediaFileUpload(file_path, mimetype=self.DOCX_MIMETYPE)
+            uploaded_file = drive_service.files().create(
+                body=file_metadata,
+                media_body=media,
+                fields='id'
+            ).execute()
+
+        drive_file_id = uploaded_file['id']
+        conversion_response = drive_service.files().copy(
+            fileId=drive_file_id,
+            body={
+                'parents': [],
+                'mimeType': 'application/vnd.google-apps.document',
+                'name': final_file_name
+            }
+        ).execute()
+
+        converted_doc_id = conversion_response['id']
+
+        permission_body = {
+            'role': 'writer',
+            'type': 'anyone',
+            'allowFileDiscovery': False,
+        }
+        drive_service.permissions().create(
+            fileId=converted_doc_id,
+            body=permission_body,
+            fields='id'
+        ).execute()
+
+        return f'https://docs.google.com/document/d/{converted_doc_id}/edit'
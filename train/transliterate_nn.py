@@ -1,4 +1,3 @@
-import os
 from transformers import AutoTokenizer, DataCollatorForTokenClassification, AutoModelForTokenClassification, TrainingArguments, Trainer, AutoConfig
 import datasets
 import pandas as pd
@@ -7,6 +6,7 @@ from datasets import Features, ClassLabel, Value, Sequence
 import numpy as np
 from datetime import datetime
 import sklearn
+from ja_transliteration_tool.pre_train.aligner.dataset import AlignDataset
 
 RESOURCES_PATH = "../../ja_transliteration_tool/resources/align"
 
@@ -20,17 +20,8 @@ id_to_label = {i: f"B-{TOKENS[i]}" for i in range(len(TOKENS))}
 label_to_id = {f"{id_to_label[i]}": i for i in range(len(id_to_label))}
 
 def get_all_couples(subdir: str):
-    coupling = []
-    for root, dirs, files in os.walk(RESOURCES_PATH + "/" + subdir):
-        for file_name in files:
-            if file_name.endswith(".txt") is False:
-                continue
-            with open(f"{root}/{file_name}", "r") as f:
-                lines = f.read().split('\n')
-                coupling.extend([eval(line) for line in lines])
-            # print(f"{root}/{file_name}")
-
-    return coupling
+    # The align tree is read through its packed dataset, which is (re)built when the tree changes
+    return AlignDataset.load(RESOURCES_PATH).get_couples([subdir])
 
 
 def clear_apostrophe(l, keep_apostrophe: bool):